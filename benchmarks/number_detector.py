@@ -0,0 +1,151 @@
+"""
+Benchmark of NumberDetector against the per-tower implementation it
+replaced. Both read the same frames: the screen images shipped with the
+bot plus random frames with synthetic HP bars. The outputs are checked to
+be identical before anything is timed.
+
+Run from the repository root:
+
+    python benchmarks/number_detector.py
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+import numpy as np
+from PIL import Image
+from PIL import ImageFilter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint: disable=wrong-import-position
+from clashroyalebuildabot.constants import HP_HEIGHT
+from clashroyalebuildabot.constants import HP_WIDTH
+from clashroyalebuildabot.constants import IMAGES_DIR
+from clashroyalebuildabot.constants import NUMBER_CONFIG
+from clashroyalebuildabot.constants import SCREENSHOT_HEIGHT
+from clashroyalebuildabot.constants import SCREENSHOT_WIDTH
+from clashroyalebuildabot.detectors.number_detector import NumberDetector
+
+
+class PerTowerNumberDetector(NumberDetector):
+    """The tower HP reading as it was, one bar at a time"""
+
+    @staticmethod
+    def _calculate_tower_hp(image, bbox, lhs_colour, rhs_colour, threshold=30):
+        crop = np.array(
+            image.crop(bbox).filter(ImageFilter.SMOOTH_MORE), dtype=np.float32
+        )
+
+        means = np.array(
+            [
+                np.mean(np.abs(crop - colour), axis=2)
+                for colour in [lhs_colour, rhs_colour]
+            ]
+        )
+        best_row = np.argmin(np.sum(np.min(means, axis=0), axis=1))
+        means = means[:, best_row, :]
+        sides = np.argmin(means, axis=0)
+        avg_min_dist = np.mean(np.where(sides, means[1], means[0]))
+
+        if avg_min_dist > threshold:
+            hp = 0.0
+        else:
+            change_point = np.argmin(np.cumsum(2 * sides - 1))
+            hp = change_point / (HP_WIDTH - 1)
+
+        return hp
+
+    def _calculate_hp(self, image, threshold=30):
+        return [
+            self._calculate_tower_hp(image, bbox, lhs, rhs, threshold)
+            for bbox, (_, _, lhs, rhs) in zip(
+                self.bboxes, NUMBER_CONFIG.values()
+            )
+        ]
+
+
+def load_frames(synthetic, seed=0):
+    """The screen images, then random frames with synthetic HP bars"""
+    screen_dir = os.path.join(IMAGES_DIR, "screen")
+    frames = [
+        Image.open(os.path.join(screen_dir, name))
+        .convert("RGB")
+        .resize((SCREENSHOT_WIDTH, SCREENSHOT_HEIGHT))
+        for name in sorted(os.listdir(screen_dir))
+    ]
+
+    rng = np.random.default_rng(seed)
+    for _ in range(synthetic):
+        pixels = rng.integers(
+            0, 256, (SCREENSHOT_HEIGHT, SCREENSHOT_WIDTH, 3), dtype=np.uint8
+        )
+        # Each bar is its lhs colour up to a random split and its rhs
+        # colour after it, with some noise on top
+        for x, y, lhs_colour, rhs_colour in NUMBER_CONFIG.values():
+            split = rng.integers(0, HP_WIDTH + 1)
+            bar = np.empty((HP_HEIGHT, HP_WIDTH, 3), dtype=int)
+            bar[:, :split] = lhs_colour
+            bar[:, split:] = rhs_colour
+            bar += rng.integers(-20, 21, bar.shape)
+            pixels[y : y + HP_HEIGHT, x : x + HP_WIDTH] = np.clip(bar, 0, 255)
+        frames.append(Image.fromarray(pixels))
+    return frames
+
+
+def best_times(functions, number, repeat):
+    """
+    The best time of one call of each function, in milliseconds. The
+    functions take turns in every repeat, so a slow patch on the machine
+    doesn't land on only one of them.
+    """
+    best = [float("inf")] * len(functions)
+    for _ in range(repeat):
+        for i, function in enumerate(functions):
+            seconds = timeit.timeit(function, number=number) / number
+            best[i] = min(best[i], seconds * 1000)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--number", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--synthetic", type=int, default=300)
+    args = parser.parse_args()
+
+    frames = load_frames(args.synthetic)
+    detector = NumberDetector()
+    reference = PerTowerNumberDetector()
+
+    mismatches = sum(
+        detector.run(frame) != reference.run(frame) for frame in frames
+    )
+    print(f"{len(frames)} frames, {mismatches} mismatches")
+    if mismatches:
+        sys.exit(1)
+
+    frame = frames[0]
+    print(
+        f"Best of {args.repeat} runs of {args.number} "
+        f"on a {SCREENSHOT_WIDTH}x{SCREENSHOT_HEIGHT} frame"
+    )
+    for name, old, new in [
+        (
+            "towers",
+            lambda: reference._calculate_hp(frame),
+            lambda: detector._calculate_hp(frame),
+        ),
+        ("run()", lambda: reference.run(frame), lambda: detector.run(frame)),
+    ]:
+        old_time, new_time = best_times((old, new), args.number, args.repeat)
+        print(
+            f"  {name:<7} {old_time:.3f} ms -> {new_time:.3f} ms "
+            f"({old_time / new_time:.2f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,7 @@ from .detectors import OnnxDetector
 from .detectors import ScreenDetector
 from .detectors import UnitDetector
 from .emulator import Emulator
+from .emulator import ReplayEmulator
 from .namespaces import Cards
 from .namespaces import Screens
 from .namespaces import State
@@ -27,5 +28,6 @@ __all__ = [
     "UnitDetector",
     "CardDetector",
     "Emulator",
+    "ReplayEmulator",
     "Bot",
 ]
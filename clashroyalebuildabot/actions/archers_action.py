@@ -1,3 +1,5 @@
+import numpy as np
+
 from clashroyalebuildabot import Cards
 from clashroyalebuildabot.actions.generic.action import Action
 
@@ -13,3 +15,15 @@ class ArchersAction(Action):
             if self.tile_y < det.position.tile_y <= 14 and (lhs or rhs):
                 score = [1, self.tile_y - det.position.tile_y]
         return score
+
+    @classmethod
+    def calculate_scores(cls, state, tiles):
+        score = 0.5 if state.numbers.elixir.number == 10 else 0
+        scores = np.full(len(tiles), score, dtype=float)
+        enemies = cls._get_enemy_tiles(state)
+        x, y = tiles[:, None, 0], tiles[:, None, 1]
+        lhs = (enemies[:, 0] <= 8) & (x == 7)
+        rhs = (enemies[:, 0] > 8) & (x == 10)
+        in_range = (y < enemies[:, 1]) & (enemies[:, 1] <= 14)
+        scores[(in_range & (lhs | rhs)).any(axis=1)] = 1
+        return scores
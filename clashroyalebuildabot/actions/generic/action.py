@@ -2,6 +2,8 @@ from abc import ABC
 from abc import abstractmethod
 from typing import Dict, Optional
 
+import numpy as np
+
 from clashroyalebuildabot.namespaces.cards import Card
 from clashroyalebuildabot.knowledge_base import knowledge_base
 
@@ -14,6 +16,8 @@ class Action(ABC):
         self.tile_x = tile_x
         self.tile_y = tile_y
         self._optimal_positioning = None
+        # Main score, when it was already calculated with calculate_scores
+        self.score = None
 
     def __repr__(self):
         return f"{self.CARD.name} at ({self.tile_x}, {self.tile_y})"
@@ -21,6 +25,63 @@ class Action(ABC):
     @abstractmethod
     def calculate_score(self, state):
         pass
+
+    @classmethod
+    def calculate_scores(cls, state, tiles):
+        """
+        The main score, the first item of calculate_score, for each row of
+        tiles, an (N, 2) array of tile x and y.
+
+        Actions can override this to score every tile at once. By default
+        each tile is scored on its own.
+        """
+        return np.array(
+            [
+                cls(None, x, y).calculate_score(state)[0]
+                for x, y in tiles.tolist()
+            ],
+            dtype=float,
+        )
+
+    @staticmethod
+    def _get_enemy_tiles(state):
+        """The tile x and y of each enemy, as an (M, 2) array"""
+        return np.array(
+            [
+                (det.position.tile_x, det.position.tile_y)
+                for det in state.enemies
+            ],
+            dtype=float,
+        ).reshape(-1, 2)
+
+    @classmethod
+    def _get_enemy_distances(cls, state, tiles, y_offset=0):
+        """The (N, M) distances from each tile to each enemy"""
+        enemies = cls._get_enemy_tiles(state)
+        return np.hypot(
+            tiles[:, None, 0] - enemies[None, :, 0],
+            tiles[:, None, 1] - enemies[None, :, 1] + y_offset,
+        )
+
+    @classmethod
+    def _get_range_scores(cls, state, tiles, min_distance, max_distance):
+        """
+        1 for each tile where the first enemy, in detection order, closer
+        than max_distance is further than min_distance, and 0 otherwise
+        """
+        if not state.enemies:
+            return np.zeros(len(tiles))
+        distances = cls._get_enemy_distances(state, tiles)
+        # An enemy at exactly min_distance is skipped, as it matches
+        # neither check of the per-tile loop
+        decisive = (distances < max_distance) & (distances != min_distance)
+        first = distances[np.arange(len(tiles)), decisive.argmax(axis=1)]
+        return (decisive.any(axis=1) & (first > min_distance)).astype(float)
+
+    @staticmethod
+    def _is_tile_in(tiles, targets):
+        """Whether each row of tiles is one of the target tiles"""
+        return (tiles[:, None, :] == np.array(targets)[None]).all(-1).any(-1)
     
     def get_optimal_positioning(self, state, situation: str = "default") -> Dict:
         """Retorna posicionamento ótimo baseado no banco de dados"""
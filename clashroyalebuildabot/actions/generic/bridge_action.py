@@ -1,3 +1,5 @@
+import numpy as np
+
 from clashroyalebuildabot.actions.generic.action import Action
 
 
@@ -23,3 +25,9 @@ class BridgeAction(Action):
             score = [1, right_hp > 0, right_hp <= left_hp]
 
         return score
+
+    @classmethod
+    def calculate_scores(cls, state, tiles):
+        if state.numbers.elixir.number != 10:
+            return np.zeros(len(tiles))
+        return cls._is_tile_in(tiles, [(3, 15), (14, 15)]).astype(float)
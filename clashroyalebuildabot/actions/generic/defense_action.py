@@ -1,3 +1,5 @@
+import numpy as np
+
 from clashroyalebuildabot.actions.generic.action import Action
 
 
@@ -29,3 +31,18 @@ class DefenseAction(Action):
             return [0]
 
         return [1]
+
+    @classmethod
+    def calculate_scores(cls, state, tiles):
+        scores = np.zeros(len(tiles))
+        enemies = cls._get_enemy_tiles(state)
+        enemies = enemies[enemies[:, 1] <= 16]
+        rhs = np.count_nonzero(enemies[:, 0] >= 9)
+        lhs = len(enemies) - rhs
+        if lhs == rhs == 0:
+            return scores
+
+        scores[cls._is_tile_in(tiles, [(8, 9)])] = 1
+        if lhs < rhs:
+            scores[cls._is_tile_in(tiles, [(9, 9)])] = 1
+        return scores
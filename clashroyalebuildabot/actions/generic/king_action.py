@@ -21,3 +21,7 @@ class KingAction(Action):
             min_distance = min(min_distance, distance)
 
         return [0.5, -min_distance]
+
+    @classmethod
+    def calculate_scores(cls, state, tiles):
+        return 0.5 * cls._is_tile_in(tiles, [(8, 0), (9, 0)])
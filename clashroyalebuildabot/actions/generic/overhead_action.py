@@ -1,5 +1,7 @@
 import math
 
+import numpy as np
+
 from clashroyalebuildabot.actions.generic.action import Action
 
 
@@ -18,3 +20,11 @@ class OverheadAction(Action):
             if distance < 1:
                 score = [1, -distance]
         return score
+
+    @classmethod
+    def calculate_scores(cls, state, tiles):
+        score = 0.5 if state.numbers.elixir.number == 10 else 0
+        scores = np.full(len(tiles), score, dtype=float)
+        distances = cls._get_enemy_distances(state, tiles)
+        scores[(distances < 1).any(axis=1)] = 1
+        return scores
@@ -1,5 +1,7 @@
 import math
 
+import numpy as np
+
 from clashroyalebuildabot.actions.generic.action import Action
 from clashroyalebuildabot.namespaces.units import Units
 
@@ -30,3 +32,13 @@ class SpellAction(Action):
             hit_score,
             max_distance,
         ]
+
+    @classmethod
+    def calculate_scores(cls, state, tiles):
+        distances = cls._get_enemy_distances(state, tiles, y_offset=2)
+        unit_scores = np.array(
+            [cls.UNIT_TO_SCORE.get(det.unit, 2) for det in state.enemies],
+            dtype=float,
+        )
+        hit_scores = (distances <= cls.RADIUS - 1) @ unit_scores
+        return (hit_scores >= cls.MIN_SCORE).astype(float)
@@ -1,3 +1,5 @@
+import numpy as np
+
 from clashroyalebuildabot import Cards
 from clashroyalebuildabot.actions.generic.action import Action
 
@@ -19,3 +21,16 @@ class GoblinBarrelAction(Action):
             return [0.5]
 
         return [0]
+
+    @classmethod
+    def calculate_scores(cls, state, tiles):
+        left_hp = state.numbers.left_enemy_princess_hp.number
+        right_hp = state.numbers.right_enemy_princess_hp.number
+
+        king_tiles = [(8, 27), (9, 27), (8, 28), (9, 28)]
+        scores = 0.5 * cls._is_tile_in(tiles, king_tiles)
+        if left_hp > 0:
+            scores[cls._is_tile_in(tiles, [(3, 25)])] = 1
+        if right_hp > 0:
+            scores[cls._is_tile_in(tiles, [(14, 25)])] = 1
+        return scores
@@ -18,3 +18,7 @@ class MusketeerAction(Action):
             if distance < 5:
                 return [0]
         return [0]
+
+    @classmethod
+    def calculate_scores(cls, state, tiles):
+        return cls._get_range_scores(state, tiles, 5, 6)
@@ -0,0 +1,34 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass
+class ActionCandidates:
+    """
+    Every tile one ready card could be played on: tiles is an (N, 2) array
+    of tile x and y, and mask says which of them the card can be placed on
+    """
+
+    action_class: type
+    index: int
+    tiles: np.ndarray
+    mask: np.ndarray
+
+    @property
+    def valid_tiles(self):
+        return self.tiles[self.mask]
+
+    def calculate_scores(self, state):
+        """The main score of each valid tile, in one call"""
+        return self.action_class.calculate_scores(state, self.valid_tiles)
+
+    def to_actions(self, scores=None):
+        """One action per valid tile, carrying its score if given"""
+        actions = []
+        for i, (x, y) in enumerate(self.valid_tiles.tolist()):
+            action = self.action_class(self.index, x, y)
+            if scores is not None:
+                action.score = float(scores[i])
+            actions.append(action)
+        return actions
@@ -5,7 +5,11 @@ from typing import Dict, List, Optional, Tuple
 
 import keyboard
 from loguru import logger
+import numpy as np
 
+from clashroyalebuildabot.bot.action_candidates import ActionCandidates
+from clashroyalebuildabot.bot.step_context import per_step
+from clashroyalebuildabot.bot.step_context import StepContext
 from clashroyalebuildabot.constants import ALL_TILES
 from clashroyalebuildabot.constants import ALLY_TILES
 from clashroyalebuildabot.constants import DISPLAY_CARD_DELTA_X
@@ -22,6 +26,7 @@ from clashroyalebuildabot.constants import TILE_INIT_Y
 from clashroyalebuildabot.constants import TILE_WIDTH
 from clashroyalebuildabot.detectors.detector import Detector
 from clashroyalebuildabot.emulator.emulator import Emulator
+from clashroyalebuildabot.emulator.replay_emulator import ReplayEmulator
 from clashroyalebuildabot.ml.data_collector import GameDataCollector
 from clashroyalebuildabot.ml.ml_bot import MLBot
 from clashroyalebuildabot.ml.deck_analyzer import DeckAnalyzer
@@ -56,9 +61,44 @@ except Exception as e:
     knowledge_base = DummyKnowledgeBase()
     logger.warning("Using dummy knowledge base due to import error")
 from clashroyalebuildabot.namespaces import Screens
+from clashroyalebuildabot.namespaces.units import UnitEvent
 from clashroyalebuildabot.visualizer import Visualizer
 from error_handling import WikifiedError
 
+# Every tile a card can be placed on, in one fixed order, so where each
+# card can go is a mask over the same array
+CANDIDATE_TILES = np.array(
+    ALL_TILES
+    + [
+        tile
+        for tile in LEFT_PRINCESS_TILES + RIGHT_PRINCESS_TILES
+        if tile not in ALL_TILES
+    ]
+)
+
+
+def get_tile_mask(tiles):
+    """Which of CANDIDATE_TILES are in tiles, as a read-only mask"""
+    tiles = {tuple(tile) for tile in tiles}
+    mask = np.array([tuple(tile) in tiles for tile in CANDIDATE_TILES.tolist()])
+    mask.flags.writeable = False
+    return mask
+
+
+CANDIDATE_TILES.flags.writeable = False
+ALL_TILES_MASK = get_tile_mask(ALL_TILES)
+# Where cards that can't target anywhere can be placed, keyed by whether
+# the left and right enemy princess towers are destroyed
+PLACEMENT_MASKS = {
+    (left_destroyed, right_destroyed): get_tile_mask(
+        ALLY_TILES
+        + (LEFT_PRINCESS_TILES if left_destroyed else [])
+        + (RIGHT_PRINCESS_TILES if right_destroyed else [])
+    )
+    for left_destroyed in (False, True)
+    for right_destroyed in (False, True)
+}
+
 pause_event = threading.Event()
 pause_event.set()
 is_paused_logged = False
@@ -68,6 +108,7 @@ is_resumed_logged = True
 class Bot:
     is_paused_logged = False
     is_resumed_logged = True
+    FRAME_TIMEOUT = 5
 
     def __init__(self, actions, config):
         self.actions = actions
@@ -100,7 +141,12 @@ class Bot:
             logger.warning("Using dummy visualizer due to initialization error")
         
         try:
-            self.emulator = Emulator(**config["adb"])
+            replay_config = config.get("replay", {})
+            if replay_config.get("path"):
+                self.emulator = ReplayEmulator(**replay_config)
+                logger.info(f"Replaying recording {replay_config['path']}")
+            else:
+                self.emulator = Emulator(**config["adb"])
             logger.debug("Emulator initialized successfully")
         except Exception as e:
             logger.error(f"Error initializing emulator: {e}")
@@ -109,7 +155,11 @@ class Bot:
             raise  # Emulator é crítico, não podemos continuar sem ele
         
         try:
-            self.detector = Detector(cards=cards)
+            self.detector = Detector(
+                cards=cards,
+                session_config=config.get("onnx"),
+                **config.get("detector", {}),
+            )
             logger.debug("Detector initialized successfully")
         except Exception as e:
             logger.error(f"Error initializing detector: {e}")
@@ -126,11 +176,17 @@ class Bot:
             logger.error(f"Error initializing advanced screen detector: {e}")
             # Fallback para detector dummy
             class DummyAdvancedScreenDetector:
-                def run(self, *args): return Screens.UNKNOWN
+                def run(self, *args, **kwargs): return Screens.UNKNOWN
                 def get_screen_info(self, *args): return {'error': 'dummy'}
             self.advanced_screen_detector = DummyAdvancedScreenDetector()
             logger.warning("Using dummy advanced screen detector due to error")
         self.state = None
+        # Valores derivados do estado atual, calculados uma vez por frame
+        self.step_context = None
+        self.step_context_hits = 0
+        self.step_context_misses = 0
+        # Sequence number of the last frame the main loop processed
+        self.frame_seq = 0
         self.play_action_delay = config.get("ingame", {}).get("play_action", 1)
 
         # Sistema de memória de deck
@@ -444,21 +500,18 @@ class Bot:
         y = DISPLAY_CARD_Y + DISPLAY_CARD_HEIGHT / 2
         return x, y
 
-    def _get_valid_tiles(self):
-        tiles = ALLY_TILES
-        
+    def _get_placement_mask(self):
+        """Os tiles onde cartas comuns podem ser jogadas, pré-calculados"""
         # Verifica torres inimigas destruídas
         left_enemy_tower_destroyed = self.state.numbers.left_enemy_princess_hp.number == 0
         right_enemy_tower_destroyed = self.state.numbers.right_enemy_princess_hp.number == 0
         
         if left_enemy_tower_destroyed:
-            tiles += LEFT_PRINCESS_TILES
             logger.debug("Left enemy tower destroyed - expanded tiles")
         if right_enemy_tower_destroyed:
-            tiles += RIGHT_PRINCESS_TILES
             logger.debug("Right enemy tower destroyed - expanded tiles")
         
-        return tiles
+        return PLACEMENT_MASKS[(left_enemy_tower_destroyed, right_enemy_tower_destroyed)]
     
     def _analyze_tower_situation(self):
         """Analisa situação das torres"""
@@ -580,6 +633,24 @@ class Bot:
         
         return tower_analysis
 
+    def get_candidates(self):
+        """The tiles each affordable ready card can be played on"""
+        valid_mask = self._get_placement_mask()
+        candidates = []
+        for i in self.state.ready:
+            card = self.state.cards[i + 1]
+            if self.state.numbers.elixir.number < card.cost:
+                logger.debug(f"Card {card.name} too expensive: {card.cost} > {self.state.numbers.elixir.number}")
+                continue
+
+            mask = ALL_TILES_MASK if card.target_anywhere else valid_mask
+            candidates.append(
+                ActionCandidates(
+                    self.cards_to_actions[card], i, CANDIDATE_TILES, mask
+                )
+            )
+        return candidates
+
     def get_actions(self):
         if not self.state:
             logger.warning("No state available")
@@ -590,64 +661,86 @@ class Bot:
         logger.debug(f"State cards: {len(self.state.cards) if self.state.cards else 0}")
         logger.debug(f"State elixir: {self.state.numbers.elixir.number if hasattr(self.state.numbers, 'elixir') else 'N/A'}")
         
-        valid_tiles = self._get_valid_tiles()
         actions = []
-        for i in self.state.ready:
-            card = self.state.cards[i + 1]
-            if self.state.numbers.elixir.number < card.cost:
-                logger.debug(f"Card {card.name} too expensive: {card.cost} > {self.state.numbers.elixir.number}")
-                continue
-
-            tiles = ALL_TILES if card.target_anywhere else valid_tiles
-            card_actions = [
-                self.cards_to_actions[card](i, x, y) for (x, y) in tiles
-            ]
-            actions.extend(card_actions)
+        for candidates in self.get_candidates():
+            scores = candidates.calculate_scores(self.state)
+            actions.extend(candidates.to_actions(scores))
 
         logger.debug(f"Generated {len(actions)} actions")
         return actions
 
+    def _set_state_from_frame(self, frame):
+        """Detecta o estado do jogo num frame já fixado no buffer"""
+        # The detectors crop what they need straight from the frame,
+        # so only those regions get converted to RGB
+        logger.debug("Running detector on frame")
+        self.state = self.detector.run(frame)
+        logger.debug("Detector run completed")
+        
+        # Usar detector avançado se o detector normal não conseguiu detectar
+        if hasattr(self.state, 'screen') and self.state.screen.name == 'unknown':
+            logger.debug("Unknown screen detected, trying advanced detector")
+            try:
+                # The detector has already compared the screen hashes
+                advanced_screen = self.advanced_screen_detector.run(
+                    frame.to_image(), use_hash=False
+                )
+                if advanced_screen == Screens.IN_GAME:
+                    # Staged detection skipped the in-game detectors
+                    # on what looked like a menu, so run them now
+                    logger.info(f"Advanced detector found: {advanced_screen.name}")
+                    self.state = self.detector.run(frame, advanced_screen)
+                elif advanced_screen.name != 'unknown':
+                    logger.info(f"Advanced detector found: {advanced_screen.name}")
+                    # Atualizar a tela detectada
+                    self.state.screen = advanced_screen
+                    
+                    # Se detectou tela de resultado, adicionar coordenadas de clique
+                    if advanced_screen.name == 'result_screen':
+                        logger.info("🎯 Tela de resultado detectada pelo detector avançado")
+                        # Criar uma tela de resultado com coordenadas de clique
+                        from clashroyalebuildabot.namespaces.screens import Screen
+                        result_screen = Screen(
+                            name="result_screen",
+                            ltrb=(200, 200, 520, 700),
+                            click_xy=(360, 650)  # Posição do botão jogar de novo
+                        )
+                        self.state.screen = result_screen
+            except Exception as adv_error:
+                logger.warning(f"Advanced detector error: {adv_error}")
+        
+        # Só executa visualizer se não houver erro
+        try:
+            logger.debug("Running visualizer")
+            self.visualizer.run(frame.to_image(), self.state)
+            logger.debug("Visualizer completed")
+        except Exception as viz_error:
+            logger.warning(f"Visualizer error (non-critical): {viz_error}")
+
     def set_state(self):
-        try:
-            logger.debug("Taking screenshot from emulator")
-            screenshot = self.emulator.take_screenshot()
-            logger.debug("Screenshot taken successfully")
-            
-            logger.debug("Running detector on screenshot")
-            self.state = self.detector.run(screenshot)
-            logger.debug("Detector run completed")
-            
-            # Usar detector avançado se o detector normal não conseguiu detectar
-            if hasattr(self.state, 'screen') and self.state.screen.name == 'unknown':
-                logger.debug("Unknown screen detected, trying advanced detector")
-                try:
-                    advanced_screen = self.advanced_screen_detector.run(screenshot)
-                    if advanced_screen.name != 'unknown':
-                        logger.info(f"Advanced detector found: {advanced_screen.name}")
-                        # Atualizar a tela detectada
-                        self.state.screen = advanced_screen
-                        
-                        # Se detectou tela de resultado, adicionar coordenadas de clique
-                        if advanced_screen.name == 'result_screen':
-                            logger.info("🎯 Tela de resultado detectada pelo detector avançado")
-                            # Criar uma tela de resultado com coordenadas de clique
-                            from clashroyalebuildabot.namespaces.screens import Screen
-                            result_screen = Screen(
-                                name="result_screen",
-                                ltrb=(200, 200, 520, 700),
-                                click_xy=(360, 650)  # Posição do botão jogar de novo
-                            )
-                            self.state.screen = result_screen
-                except Exception as adv_error:
-                    logger.warning(f"Advanced detector error: {adv_error}")
-            
-            # Só executa visualizer se não houver erro
+        """
+        Detecta o estado num frame novo. Retorna False se nenhum frame novo
+        chegou ou a detecção falhou, caso em que o estado é o anterior.
+        """
+        try:
+            logger.debug("Waiting for a new frame from emulator")
+            frame = self.emulator.wait_for_frame(
+                self.frame_seq, timeout=self.FRAME_TIMEOUT, pin=True
+            )
+            if frame is None:
+                logger.warning(
+                    f"No new frame in {self.FRAME_TIMEOUT} seconds, "
+                    "keeping the previous state"
+                )
+                return False
+            self.frame_seq = frame.seq
+            logger.debug("Frame taken successfully")
+            # The frame is pinned, so the decoder can't write over it
+            # while the detectors and the visualizer still read it
             try:
-                logger.debug("Running visualizer")
-                self.visualizer.run(screenshot, self.state)
-                logger.debug("Visualizer completed")
-            except Exception as viz_error:
-                logger.warning(f"Visualizer error (non-critical): {viz_error}")
+                self._set_state_from_frame(frame)
+            finally:
+                self.emulator.release_frame(frame)
             
             # Adiciona logs para diagnosticar
             if self.state:
@@ -669,6 +762,8 @@ class Bot:
                 logger.warning("Creating dummy state due to error")
                 from clashroyalebuildabot.namespaces import State
                 self.state = State([], [], [], [], False, Screens.UNKNOWN)
+            return False
+        return True
 
     def play_action(self, action):
         try:
@@ -681,8 +776,8 @@ class Bot:
             else:
                 tile_centre = self._get_tile_centre(action.tile_x, action.tile_y)
             
-            self.emulator.click(*card_centre)
-            self.emulator.click(*tile_centre)
+            placement_time = self.emulator.place_card(card_centre, tile_centre)
+            logger.debug(f"Card placed in {placement_time * 1000:.0f} ms")
         except Exception as e:
             logger.error(f"Error playing action {action}: {e}")
             # Não falha a execução, apenas loga o erro
@@ -1359,19 +1454,41 @@ class Bot:
             logger.debug(f"Error calculating surviving troops elixir: {e}")
             return 0  # Valor padrão
     
+    def get_step_context(self):
+        """O contexto do estado atual, trocado quando chega um novo estado"""
+        if self.step_context is None or self.step_context.state is not self.state:
+            if self.step_context is not None:
+                self.step_context_hits += self.step_context.hits
+                self.step_context_misses += self.step_context.misses
+                logger.debug(
+                    f"Step context: {self.step_context.hits} reused, "
+                    f"{self.step_context.misses} computed"
+                )
+            self.step_context = StepContext(self.state)
+        return self.step_context
+
+    @per_step
     def _get_enemy_units(self):
         """Obtém unidades inimigas no campo"""
         enemy_units = []
         if hasattr(self.state, 'enemies') and self.state.enemies:
+            # Trilhas do rastreador, para ID e velocidade de cada unidade
+            tracks = {id(track.detection): track for track in getattr(self.state, 'tracks', [])}
             for unit in self.state.enemies:
                 if hasattr(unit, 'unit') and hasattr(unit.unit, 'name'):
-                    enemy_units.append({
+                    enemy_unit = {
                         "name": unit.unit.name,
                         "health": getattr(unit, 'health', 100),
                         "position": (unit.position.tile_x, unit.position.tile_y) if hasattr(unit, 'position') else (0, 0)
-                    })
+                    }
+                    track = tracks.get(id(unit))
+                    if track is not None:
+                        enemy_unit["track_id"] = track.track_id
+                        enemy_unit["velocity"] = tuple(float(v) for v in track.velocity)
+                    enemy_units.append(enemy_unit)
         return enemy_units
     
+    @per_step
     def _get_our_units(self):
         """Obtém nossas unidades no campo"""
         our_units = []
@@ -1385,6 +1502,7 @@ class Bot:
                     })
         return our_units
 
+    @per_step
     def _analyze_game_situation(self):
         """Analisa a situação atual do jogo com detalhes avançados"""
         situation = {
@@ -1802,6 +1920,11 @@ class Bot:
     def _is_play_again_screen(self, screen) -> bool:
         """Detecta se está na tela de 'jogar de novo' (crowns/resultado)"""
         try:
+            # O lobby também tem click_xy (botão de batalha), mas é tratado
+            # pelo auto-start, não como tela de resultado
+            if screen == Screens.LOBBY:
+                return False
+            
             # Verificar se é uma tela de resultado (crowns)
             if hasattr(screen, 'name'):
                 screen_name = screen.name.lower()
@@ -2723,7 +2846,11 @@ class Bot:
             old_screen = self.state.screen if self.state else None
             
             logger.debug("Setting new state")
-            self.set_state()
+            if not self.set_state():
+                # Sem frame novo o estado é antigo, e agir sobre ele
+                # repetiria cartas ou cliques já feitos
+                logger.debug("No new state, skipping step")
+                return
             
             logger.debug("Getting new screen state")
             new_screen = self.state.screen if self.state else None
@@ -2748,7 +2875,9 @@ class Bot:
             # Tenta novamente após um breve delay
             logger.warning("Unknown screen detected, retrying...")
             time.sleep(1)
-            self.set_state()
+            if not self.set_state():
+                logger.debug("No new state, skipping step")
+                return
             new_screen = self.state.screen if self.state else Screens.UNKNOWN
             
             if new_screen == Screens.UNKNOWN:
@@ -2917,6 +3046,7 @@ class Bot:
                     logger.info("Reset end_of_game_clicked for new game")
                 
                 self.emulator.click(*self.state.screen.click_xy)
+                self.emulator.reset_longest_frame_gap()
                 self._log_and_wait("Starting game", 2)
                 # Registrar início da partida
                 self.game_start_time = time.time()
@@ -2943,7 +3073,48 @@ class Bot:
             # Continua executando em vez de fechar
             time.sleep(1)
 
+    def _record_enemy_deployments(self):
+        """Registra na memória as cartas inimigas recém-colocadas"""
+        # Só unidades novas, não as mesmas unidades a cada frame
+        deployed = {}
+        for event in self.state.events:
+            if event.kind == UnitEvent.DEPLOYED and event.track.side == "enemy":
+                # Cartas com várias unidades contam uma vez só
+                deployed.setdefault(event.track.name, event.track)
+        for name, track in deployed.items():
+            if name != 'unknown' and name != 'blank':
+                self.deck_memory.record_enemy_card_seen(name)
+                
+                # Registrar ação do oponente para análise de padrões
+                if self.pattern_analyzer:
+                    tile_x, tile_y = track.tile
+                    opponent_action = {
+                        'card_name': name,
+                        'elixir_cost': self._get_card_elixir_cost(name),
+                        'tile_x': round(tile_x),
+                        'tile_y': round(tile_y)
+                    }
+                    game_state = {
+                        'elixir': self.state.numbers.elixir.number if hasattr(self.state.numbers, 'elixir') else 0,
+                        'ally_tower_health': [self.state.numbers.ally_left_tower.number, self.state.numbers.ally_right_tower.number] if hasattr(self.state.numbers, 'ally_left_tower') else [1.0, 1.0],
+                        'enemy_tower_health': [self.state.numbers.enemy_left_tower.number, self.state.numbers.enemy_right_tower.number] if hasattr(self.state.numbers, 'enemy_left_tower') else [1.0, 1.0],
+                        'game_time': time.time() - self.game_start_time if hasattr(self, 'game_start_time') and self.game_start_time is not None else 0
+                    }
+                    self.pattern_analyzer.record_opponent_action(opponent_action, game_state)
+
     def _handle_game_step(self):
+        # Iniciar sistema de memória se não foi iniciado
+        if not hasattr(self, 'memory_started') or not self.memory_started:
+            self.deck_memory.reset_for_new_game()
+            self.detector.unit_tracker.reset()
+            self.memory_started = True
+            logger.info("Deck memory system started for new game")
+
+        # Os eventos de cada frame são registrados antes de qualquer
+        # retorno antecipado, senão colocações vistas sem elixir se perdem
+        self._record_enemy_deployments()
+        enemy_units = self._get_enemy_units()
+
         try:
             actions = self.get_actions()
             if not actions:
@@ -2988,38 +3159,10 @@ class Bot:
                 self.end_of_game_clicked = False
                 logger.info("Reset end_of_game_clicked for new game (game started)")
         
-        # Iniciar sistema de memória se não foi iniciado
-        if not hasattr(self, 'memory_started') or not self.memory_started:
-            self.deck_memory.reset_for_new_game()
-            self.memory_started = True
-            logger.info("Deck memory system started for new game")
-
         # Detectar cartas do inimigo e registrar na memória
         if self.enable_ml and self.enemy_detector:
             self.enemy_detector.detect_enemy_cards(self.state)
         
-        # Registrar cartas inimigas vistas na memória
-        enemy_units = self._get_enemy_units()
-        for unit in enemy_units:
-            if unit['name'] != 'unknown' and unit['name'] != 'blank':
-                self.deck_memory.record_enemy_card_seen(unit['name'])
-                
-                # Registrar ação do oponente para análise de padrões
-                if self.pattern_analyzer:
-                    opponent_action = {
-                        'card_name': unit['name'],
-                        'elixir_cost': self._get_card_elixir_cost(unit['name']),
-                        'tile_x': unit.get('x', 0),
-                        'tile_y': unit.get('y', 0)
-                    }
-                    game_state = {
-                        'elixir': self.state.numbers.elixir.number if hasattr(self.state.numbers, 'elixir') else 0,
-                        'ally_tower_health': [self.state.numbers.ally_left_tower.number, self.state.numbers.ally_right_tower.number] if hasattr(self.state.numbers, 'ally_left_tower') else [1.0, 1.0],
-                        'enemy_tower_health': [self.state.numbers.enemy_left_tower.number, self.state.numbers.enemy_right_tower.number] if hasattr(self.state.numbers, 'enemy_left_tower') else [1.0, 1.0],
-                        'game_time': time.time() - self.game_start_time if hasattr(self, 'game_start_time') and self.game_start_time is not None else 0
-                    }
-                    self.pattern_analyzer.record_opponent_action(opponent_action, game_state)
-        
         # Obter análise do inimigo
         enemy_analysis = None
         if self.enable_ml and self.enemy_detector:
@@ -3055,8 +3198,10 @@ class Bot:
             strategy_adaptation = self.adaptive_strategy.analyze_opponent_and_adapt(opponent_profile, game_state)
             logger.info(f"🎯 Strategy adapted: {strategy_adaptation.get('strategy', 'balanced')} - {strategy_adaptation.get('reason', 'unknown')}")
         
-        # Análise estratégica da situação com detecção de ameaças
-        situation_analysis = self._analyze_game_situation()
+        # Análise estratégica da situação com detecção de ameaças.
+        # Cópia, porque os ajustes táticos abaixo não devem vazar para o
+        # posicionamento e a recompensa, que leem a análise do mesmo passo
+        situation_analysis = dict(self._analyze_game_situation())
         
         # === ESTRATÉGIAS BASEADAS NA FASE DO JOGO ===
         
@@ -3217,12 +3362,19 @@ class Bot:
         best_action = None
         best_score = -float('inf')
 
-        for action in filtered_actions:
+        # Score do ML de todas as ações numa única predição
+        ml_scores = None
+        if self.enable_ml and self.ml_bot and self.ml_bot.trained:
+            ml_scores = self.ml_bot.score_actions(self.state, filtered_actions, enemy_analysis)
+
+        for i, action in enumerate(filtered_actions):
             # Obter nome da carta
             card_name = self.state.cards[action.index + 1].name if hasattr(self.state, 'cards') and len(self.state.cards) > action.index + 1 else "unknown"
             
-            # Score original do bot
-            original_score = action.calculate_score(self.state)
+            # Score original do bot (já calculado para todos os tiles)
+            original_score = action.score
+            if original_score is None:
+                original_score = action.calculate_score(self.state)
             
             # Garante que o score é um número
             if isinstance(original_score, list):
@@ -3244,8 +3396,8 @@ class Bot:
             
             # Score do ML (se treinado)
             ml_score = 0.5  # Score neutro padrão
-            if self.enable_ml and self.ml_bot and self.ml_bot.trained:
-                ml_score = self.ml_bot.predict_action_score(self.state, action, enemy_analysis)
+            if ml_scores is not None:
+                ml_score = ml_scores[i]
             
             # Bônus baseado na análise do inimigo
             enemy_bonus = 0
@@ -3255,18 +3407,11 @@ class Bot:
             # Análise de inteligência de cartas
             card_intelligence_bonus = 0
             if card_name != "unknown" and card_name != "blank":
-                # Criar estado do jogo para análise
-                game_state = {
-                    "elixir": self.state.numbers.elixir.number if hasattr(self.state.numbers, 'elixir') else 0,
-                    "under_pressure": self._is_under_pressure(),
-                    "advantage": self._has_advantage(),
-                    "enemy_elixir_state": self._get_enemy_elixir_state(),
-                    "has_tank": self._has_tank_on_field(),
-                    "need_air_defense": self._needs_air_defense()
-                }
-                
-                # Análise de decisão da carta
-                card_decision = knowledge_base.analyze_card_decision(card_name, game_state, enemy_analysis)
+                # Análise de decisão da carta, uma vez por carta neste passo
+                card_decision = knowledge_base.analyze_card_decision(
+                    card_name, self._get_card_game_state(), enemy_analysis,
+                    step=self.get_step_context(),
+                )
                 
                 # Aplicar bônus baseado na decisão
                 if card_decision["decision"] == "use":
@@ -3327,7 +3472,9 @@ class Bot:
         our_elixir = self.state.numbers.elixir.number
         
         # Recompensa base da ação
-        action_score = action.calculate_score(self.state)
+        action_score = action.score
+        if action_score is None:
+            action_score = action.calculate_score(self.state)
         if isinstance(action_score, list):
             action_score = action_score[0] if action_score else 0
         reward += float(action_score) / 100
@@ -3516,6 +3663,19 @@ class Bot:
         
         return min(bonus, 0.5)  # Limita o bônus máximo
     
+    @per_step
+    def _get_card_game_state(self):
+        """Estado do jogo usado na análise de decisão das cartas"""
+        return {
+            "elixir": self.state.numbers.elixir.number if hasattr(self.state.numbers, 'elixir') else 0,
+            "under_pressure": self._is_under_pressure(),
+            "advantage": self._has_advantage(),
+            "enemy_elixir_state": self._get_enemy_elixir_state(),
+            "has_tank": self._has_tank_on_field(),
+            "need_air_defense": self._needs_air_defense()
+        }
+
+    @per_step
     def _is_under_pressure(self):
         """Verifica se estamos sob pressão"""
         if not hasattr(self.state, 'enemy_towers') or not self.state.enemy_towers:
@@ -3528,6 +3688,7 @@ class Bot:
         
         return False
     
+    @per_step
     def _has_advantage(self):
         """Verifica se temos vantagem"""
         if not hasattr(self.state, 'elixir'):
@@ -3546,11 +3707,13 @@ class Bot:
         
         return False
     
+    @per_step
     def _get_enemy_elixir_state(self):
         """Estima o estado do elixir inimigo"""
         # Implementação básica - pode ser melhorada com análise mais sofisticada
         return "medium_elixir"  # Padrão
     
+    @per_step
     def _has_tank_on_field(self):
         """Verifica se temos um tank no campo"""
         if not hasattr(self.state, 'ally_units') or not self.state.ally_units:
@@ -3563,6 +3726,7 @@ class Bot:
         
         return False
     
+    @per_step
     def _needs_air_defense(self):
         """Verifica se precisamos de defesa aérea"""
         if not hasattr(self.state, 'enemy_units') or not self.state.enemy_units:
@@ -3681,6 +3845,21 @@ class Bot:
         # Mostrar estatísticas gerais
         logger.info(f"📊 ESTATÍSTICAS GERAIS:")
         logger.info(f"   • Total de partidas jogadas: {self.games_played}")
+        logger.info(
+            "   • Maior intervalo entre frames: "
+            f"{self.emulator.reset_longest_frame_gap():.2f} segundos"
+        )
+        unit_detector = self.detector.unit_detector
+        logger.info(
+            "   • Detecções de unidades reaproveitadas: "
+            f"{unit_detector.n_reused}/"
+            f"{unit_detector.n_reused + unit_detector.n_inferences} frames"
+        )
+        logger.info(
+            "   • Cálculos do estado reaproveitados no mesmo frame: "
+            f"{self.step_context_hits}/"
+            f"{self.step_context_hits + self.step_context_misses}"
+        )
         if self.game_start_time is not None:
             game_duration = time.time() - self.game_start_time
             logger.info(f"   • Duração da partida: {game_duration:.1f} segundos")
@@ -0,0 +1,37 @@
+import functools
+
+
+class StepContext:
+    """
+    The values derived from one state, each computed the first time it is
+    asked for and then reused for the rest of the step.
+
+    hits and misses count how often a value was reused or computed.
+    """
+
+    def __init__(self, state):
+        self.state = state
+        self._values = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, name, compute):
+        if name in self._values:
+            self.hits += 1
+            return self._values[name]
+        self.misses += 1
+        value = compute()
+        self._values[name] = value
+        return value
+
+
+def per_step(method):
+    """Compute a method of the bot once per state"""
+
+    @functools.wraps(method)
+    def wrapper(self):
+        return self.get_step_context().get(
+            method.__name__, lambda: method(self)
+        )
+
+    return wrapper
@@ -6,6 +6,7 @@ from clashroyalebuildabot.namespaces import Units
 SRC_DIR = os.path.dirname(__file__)
 DEBUG_DIR = os.path.join(SRC_DIR, "debug")
 MODELS_DIR = os.path.join(SRC_DIR, "models")
+OPTIMIZED_MODELS_DIR = os.path.join(MODELS_DIR, "optimized")
 IMAGES_DIR = os.path.join(SRC_DIR, "images")
 EMULATOR_DIR = os.path.join(SRC_DIR, "emulator")
 ADB_DIR = os.path.join(EMULATOR_DIR, "platform-tools")
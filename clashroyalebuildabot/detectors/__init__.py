@@ -5,6 +5,7 @@ from .number_detector import NumberDetector
 from .onnx_detector import OnnxDetector
 from .screen_detector import ScreenDetector
 from .unit_detector import UnitDetector
+from .unit_tracker import UnitTracker
 from .advanced_detector import AdvancedDetector
 from .advanced_screen_detector import AdvancedScreenDetector
 
@@ -14,6 +15,7 @@ __all__ = [
     "ScreenDetector",
     "NumberDetector",
     "UnitDetector",
+    "UnitTracker",
     "CardDetector",
     "AdvancedDetector",
     "AdvancedScreenDetector",
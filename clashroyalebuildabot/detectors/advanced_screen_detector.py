@@ -321,7 +321,7 @@ class AdvancedScreenDetector:
             logger.debug(f"Error checking game indicators: {e}")
             return False
 
-    def run(self, image: Image) -> Screen:
+    def run(self, image: Image, use_hash=True) -> Screen:
         """Detecta a tela atual usando múltiplas técnicas"""
         try:
             # Converter PIL para numpy array
@@ -331,7 +331,10 @@ class AdvancedScreenDetector:
                 image_array = image
             
             # Primeiro, tentar detecção tradicional por hash
-            current_screen = self._detect_by_hash(image)
+            # (use_hash=False quando o ScreenDetector já comparou os hashes)
+            current_screen = Screens.UNKNOWN
+            if use_hash:
+                current_screen = self._detect_by_hash(image)
             
             # Se não conseguiu detectar, usar técnicas avançadas
             if current_screen.name == 'unknown':
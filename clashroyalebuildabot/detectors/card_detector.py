@@ -14,6 +14,9 @@ class CardDetector:
     HAND_SIZE = 5
     MULTI_HASH_SCALE = 0.355
     MULTI_HASH_INTERCEPT = 163
+    # Mean difference, in colour levels, that marks a hand slot as changed
+    SLOT_CHANGE_THRESHOLD = 3
+    SLOT_SAMPLE_STEP = 2
 
     def __init__(self, cards, hash_size=8, grey_std_threshold=5):
         self.cards = cards
@@ -22,6 +25,14 @@ class CardDetector:
 
         self.cards.extend([Cards.BLANK for _ in range(5)])
         self.card_hashes = self._calculate_card_hashes()
+
+        # What each hand slot looked like last time, and what was found
+        self.slot_signatures = [None] * self.HAND_SIZE
+        self.crop_hashes = np.zeros(
+            (self.hash_size * self.hash_size, self.HAND_SIZE), dtype=np.float32
+        )
+        self.slot_ready = [False] * (self.HAND_SIZE - 1)
+        self.hand = None
         
         # Mapeamento de cartas similares para melhorar detecção
         self.similar_cards = {
@@ -54,6 +65,13 @@ class CardDetector:
             dtype=np.float32,
         ).ravel()
 
+    def _calculate_crop_hash(self, image, position):
+        # Frames from the emulator can hand out the grey values directly
+        if hasattr(image, "luma"):
+            grey = Image.fromarray(image.luma(position))
+            return self._calculate_hash(grey)
+        return self._calculate_hash(image.crop(position))
+
     def _calculate_card_hashes(self):
         card_hashes = np.zeros(
             (
@@ -79,13 +97,13 @@ class CardDetector:
             ) from e
         return card_hashes
 
-    def _detect_cards(self, image):
-        crops = [image.crop(position) for position in CARD_CONFIG]
-        crop_hashes = np.array(
-            [self._calculate_hash(crop) for crop in crops]
-        ).T
+    def _detect_cards(self, image, changed_slots):
+        for i in changed_slots:
+            self.crop_hashes[:, i] = self._calculate_crop_hash(
+                image, CARD_CONFIG[i]
+            )
         hash_diffs = np.mean(
-            np.amin(np.abs(crop_hashes - self.card_hashes), axis=1), axis=1
+            np.amin(np.abs(self.crop_hashes - self.card_hashes), axis=1), axis=1
         ).T
         _, idx = linear_sum_assignment(hash_diffs)
         cards = [self.cards[i] for i in idx]
@@ -93,7 +111,7 @@ class CardDetector:
         # Pós-processamento para melhorar detecção
         cards = self._post_process_detection(cards, hash_diffs)
         
-        return cards, crops
+        return cards
 
     def _post_process_detection(self, cards, hash_diffs):
         """Pós-processa a detecção para reduzir erros comuns"""
@@ -170,15 +188,58 @@ class CardDetector:
                 return card
         return None
 
-    def _detect_if_ready(self, crops):
-        ready = []
-        for i, crop in enumerate(crops[1:]):
-            std = np.mean(np.std(np.array(crop), axis=2))
-            if std > self.grey_std_threshold:
-                ready.append(i)
-        return ready
+    def _get_slot_signature(self, image, position):
+        """A sparse sample of a slot's colours, to tell if it changed"""
+        step = self.SLOT_SAMPLE_STEP
+        if hasattr(image, "chroma"):
+            # Use the YUV planes of emulator frames without converting them
+            u, v = image.chroma(position)
+            planes = (
+                image.luma(position)[::step, ::step],
+                u[::step, ::step],
+                v[::step, ::step],
+            )
+        else:
+            planes = (np.asarray(image.crop(position))[::step, ::step],)
+        return np.concatenate([plane.ravel() for plane in planes]).astype(
+            np.int16
+        )
+
+    def _get_changed_slots(self, image):
+        changed_slots = []
+        for i, position in enumerate(CARD_CONFIG):
+            signature = self._get_slot_signature(image, position)
+            previous = self.slot_signatures[i]
+            if (
+                previous is None
+                or previous.shape != signature.shape
+                or np.mean(np.abs(signature - previous))
+                > self.SLOT_CHANGE_THRESHOLD
+            ):
+                self.slot_signatures[i] = signature
+                changed_slots.append(i)
+        return changed_slots
+
+    def _is_ready(self, image, position):
+        crop = image.crop(position)
+        std = np.mean(np.std(np.array(crop), axis=2))
+        return std > self.grey_std_threshold
+
+    def _detect_if_ready(self, image, changed_slots):
+        # The first slot is the next card, which is never playable
+        for i in changed_slots:
+            if i > 0:
+                self.slot_ready[i - 1] = self._is_ready(image, CARD_CONFIG[i])
+        return [i for i, ready in enumerate(self.slot_ready) if ready]
 
     def run(self, image):
-        cards, crops = self._detect_cards(image)
-        ready = self._detect_if_ready(crops)
-        return cards, ready
+        """
+        Only slots that look different from the last frame are hashed and
+        checked for readiness again, and the hand is only re-assigned when
+        at least one slot changed
+        """
+        changed_slots = self._get_changed_slots(image)
+        if changed_slots:
+            self.hand = self._detect_cards(image, changed_slots)
+        ready = self._detect_if_ready(image, changed_slots)
+        return self.hand, ready
@@ -1,3 +1,4 @@
+from concurrent.futures import ThreadPoolExecutor
 from copy import deepcopy
 import os
 import time
@@ -9,6 +10,8 @@ from clashroyalebuildabot.detectors.card_detector import CardDetector
 from clashroyalebuildabot.detectors.number_detector import NumberDetector
 from clashroyalebuildabot.detectors.screen_detector import ScreenDetector
 from clashroyalebuildabot.detectors.unit_detector import UnitDetector
+from clashroyalebuildabot.detectors.unit_tracker import UnitTracker
+from clashroyalebuildabot.namespaces import Screens
 from clashroyalebuildabot.namespaces import State
 from error_handling import WikifiedError
 
@@ -16,7 +19,15 @@ from error_handling import WikifiedError
 class Detector:
     DECK_SIZE = 8
 
-    def __init__(self, cards):
+    def __init__(
+        self,
+        cards,
+        session_config=None,
+        motion_threshold=0.001,
+        max_staleness=0.5,
+        concurrent=False,
+        staged=True,
+    ):
         if len(cards) != self.DECK_SIZE:
             raise WikifiedError(
                 "005", f"You must specify all {self.DECK_SIZE} of your cards"
@@ -27,21 +38,115 @@ class Detector:
         self.card_detector = CardDetector(self.cards)
         self.number_detector = NumberDetector()
         self.unit_detector = UnitDetector(
-            os.path.join(MODELS_DIR, "units_M_480x352.onnx"), self.cards
+            os.path.join(MODELS_DIR, "units_M_480x352.onnx"),
+            self.cards,
+            session_config,
+            motion_threshold,
+            max_staleness,
         )
         self.screen_detector = ScreenDetector()
+        self.unit_tracker = UnitTracker()
+        self.staged = staged
 
-    def run(self, image):
+        # onnxruntime releases the GIL, so the unit model can run on a
+        # worker while the other detectors run on the calling thread
+        self.executor = None
+        if concurrent:
+            self.executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="unit_detector"
+            )
+        self.timings = {}
+
+    @staticmethod
+    def _timed(detector, image):
+        start_time = time.perf_counter()
+        result = detector.run(image)
+        return result, time.perf_counter() - start_time
+
+    def _detect_game(self, image):
+        """Run the in-game detectors on the image, timing each one"""
+        units = None
+        if self.executor is not None:
+            units = self.executor.submit(
+                self._timed, self.unit_detector, image
+            )
+
+        (cards, ready), self.timings["cards"] = self._timed(
+            self.card_detector, image
+        )
+        numbers, self.timings["numbers"] = self._timed(
+            self.number_detector, image
+        )
+
+        if units is None:
+            (allies, enemies), self.timings["units"] = self._timed(
+                self.unit_detector, image
+            )
+        else:
+            (allies, enemies), self.timings["units"] = units.result()
+        return allies, enemies, numbers, cards, ready
+
+    def _detect(self, image, screen=None):
+        """
+        Classify the screen, then run the in-game detectors only if it is
+        the battle, unless staging is turned off
+        """
+        self.timings = {}
+        if screen is None:
+            screen, self.timings["screen"] = self._timed(
+                self.screen_detector, image
+            )
+        if self.staged and screen != Screens.IN_GAME:
+            return None, screen
+        return self._detect_game(image), screen
+
+    def _menu_state(self, screen):
+        """The state of a screen with no battle on it"""
+        return State([], [], [], [], [], screen)
+
+    def run(self, image, screen=None):
+        """
+        Detect the state shown in the image. If the screen is already
+        known, for example from another screen detector, it isn't
+        classified again.
+        """
         logger.debug("Setting state...")
         retries = 3
         for attempt in range(retries):
             try:
-                cards, ready = self.card_detector.run(image)
-                allies, enemies = self.unit_detector.run(image)
-                numbers = self.number_detector.run(image)
-                screen = self.screen_detector.run(image)
+                start_time = time.perf_counter()
+                detections, screen = self._detect(image, screen)
+                self.timings["total"] = time.perf_counter() - start_time
+                logger.debug(
+                    "Detector timings: "
+                    + ", ".join(
+                        f"{name} {seconds * 1000:.1f} ms"
+                        for name, seconds in self.timings.items()
+                    )
+                )
+                if detections is None:
+                    return self._menu_state(screen)
+                allies, enemies, numbers, cards, ready = detections
 
-                state = State(allies, enemies, numbers, cards, ready, screen)
+                # Frames carry the time they were captured at
+                timestamp = getattr(image, "timestamp", None) or time.time()
+                # Reused detections carry nothing new for the tracker
+                events = []
+                if not self.unit_detector.reused:
+                    events = self.unit_tracker.update(
+                        allies, enemies, timestamp
+                    )
+
+                state = State(
+                    allies,
+                    enemies,
+                    numbers,
+                    cards,
+                    ready,
+                    screen,
+                    self.unit_tracker.confirmed_tracks,
+                    events,
+                )
                 return state
             except Exception as e:
                 logger.error(
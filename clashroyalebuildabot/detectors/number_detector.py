@@ -10,6 +10,29 @@ from clashroyalebuildabot.namespaces.numbers import Numbers
 
 
 class NumberDetector:
+    # PIL's SMOOTH_MORE, applied the way PIL applies it: float32 weights,
+    # rows accumulated bottom to top, +0.5 then truncated, and a two pixel
+    # border left unfiltered
+    SMOOTH_SIZE, SMOOTH_SCALE, _, SMOOTH_KERNEL = (
+        ImageFilter.SMOOTH_MORE.filterargs
+    )
+    SMOOTH_WEIGHTS = (
+        np.array(SMOOTH_KERNEL, dtype=np.float32) / np.float32(SMOOTH_SCALE)
+    ).reshape(SMOOTH_SIZE)
+
+    def __init__(self):
+        self.names = list(NUMBER_CONFIG)
+        self.bboxes = [
+            (x, y, x + HP_WIDTH, y + HP_HEIGHT)
+            for x, y, _, _ in NUMBER_CONFIG.values()
+        ]
+        # Shape (towers, 2, 1, 1, 3), to broadcast over each bar's pixels.
+        # Integer colours, like the tuples they replace, so the distances
+        # are computed in float64
+        self.colours = np.array(
+            [[lhs, rhs] for _, _, lhs, rhs in NUMBER_CONFIG.values()]
+        )[:, :, None, None, :]
+
     @staticmethod
     def _calculate_elixir(image, window_size=10, threshold=50):
         crop = image.crop(ELIXIR_BOUNDING_BOX)
@@ -24,36 +47,62 @@ class NumberDetector:
             elixir = (change_points[0] + window_size) * 10 // crop.width
         return elixir
 
-    @staticmethod
-    def _calculate_hp(image, bbox, lhs_colour, rhs_colour, threshold=30):
-        crop = np.array(
-            image.crop(bbox).filter(ImageFilter.SMOOTH_MORE), dtype=np.float32
-        )
+    @classmethod
+    def _smooth(cls, bars):
+        """SMOOTH_MORE for a stack of bars, identical to PIL's output"""
+        bars = bars.astype(np.float32)
+        size_y, size_x = cls.SMOOTH_SIZE
+        height = bars.shape[1] - size_y + 1
+        width = bars.shape[2] - size_x + 1
 
-        means = np.array(
-            [
-                np.mean(np.abs(crop - colour), axis=2)
-                for colour in [lhs_colour, rhs_colour]
-            ]
-        )
-        best_row = np.argmin(np.sum(np.min(means, axis=0), axis=1))
-        means = means[:, best_row, :]
-        sides = np.argmin(means, axis=0)
-        avg_min_dist = np.mean(np.where(sides, means[1], means[0]))
+        # The rows of every kernel row at once, shape (size_y, bars, ...)
+        rows = np.stack([bars[:, dy : dy + height] for dy in range(size_y)])
+        # One weight per kernel row, broadcast over the rows' pixels
+        weights = cls.SMOOTH_WEIGHTS[:, :, None, None, None, None]
+        row_sums = rows[..., 0:width, :] * weights[:, 0]
+        for dx in range(1, size_x):
+            row_sums += rows[..., dx : dx + width, :] * weights[:, dx]
 
-        if avg_min_dist > threshold:
-            hp = 0.0
-        else:
-            change_point = np.argmin(np.cumsum(2 * sides - 1))
-            hp = change_point / (HP_WIDTH - 1)
+        total = np.full(row_sums.shape[1:], 0.5, dtype=np.float32)
+        for dy in reversed(range(size_y)):
+            total += row_sums[dy]
+
+        smoothed = bars.copy()
+        smoothed[
+            :,
+            size_y // 2 : size_y // 2 + height,
+            size_x // 2 : size_x // 2 + width,
+        ] = np.clip(total, 0, 255).astype(np.uint8)
+        return smoothed
+
+    def _calculate_hp(self, image, threshold=30):
+        # Copying the whole frame into an array costs more than all of
+        # this, so only the bars are taken out of it
+        bars = np.stack([np.asarray(image.crop(bbox)) for bbox in self.bboxes])
+        bars = self._smooth(bars)
+
+        # Distance of every pixel to both colours of its bar, for all bars.
+        # Summing the channels in order gives exactly what np.mean does
+        distances = np.abs(bars[:, None] - self.colours)
+        means = (distances[..., 0] + distances[..., 1] + distances[..., 2]) / 3
+        best_rows = np.argmin(np.sum(np.min(means, axis=1), axis=2), axis=1)
+        means = means[np.arange(len(bars)), :, best_rows, :]
+        sides = np.argmin(means, axis=1)
+        avg_min_dist = np.mean(
+            np.where(sides, means[:, 1], means[:, 0]), axis=1
+        )
 
-        return hp
+        change_points = np.argmin(np.cumsum(2 * sides - 1, axis=1), axis=1)
+        hps = change_points / (HP_WIDTH - 1)
+        return [
+            0.0 if dist > threshold else hp
+            for dist, hp in zip(avg_min_dist, hps)
+        ]
 
     def run(self, image):
         pred = {}
-        for name, (x, y, lhs_colour, rhs_colour) in NUMBER_CONFIG.items():
-            bbox = (x, y, x + HP_WIDTH, y + HP_HEIGHT)
-            hp = self._calculate_hp(image, bbox, lhs_colour, rhs_colour)
+        hps = self._calculate_hp(image)
+        for name, bbox, hp in zip(self.names, self.bboxes, hps):
             pred[name] = NumberDetection(bbox, hp)
 
         elixir = self._calculate_elixir(image)
@@ -1,61 +1,174 @@
+import os
+
+from loguru import logger
 import numpy as np
 import onnxruntime as ort
 
+from clashroyalebuildabot.constants import OPTIMIZED_MODELS_DIR
+
 
 class OnnxDetector:
-    def __init__(self, model_path):
+    EXECUTION_MODES = {
+        "sequential": ort.ExecutionMode.ORT_SEQUENTIAL,
+        "parallel": ort.ExecutionMode.ORT_PARALLEL,
+    }
+    OPTIMIZATION_LEVELS = {
+        "disable": ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+        "basic": ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+        "extended": ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+        "all": ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+    }
+    TENSOR_TYPES = {
+        "tensor(float)": np.float32,
+        "tensor(float16)": np.float16,
+    }
+    PAD_VALUE = 114
+    # Scaled value of every possible pixel, so scaling is a single lookup
+    SCALE_LUT = np.arange(256, dtype=np.float16) / np.float16(255)
+
+    def __init__(self, model_path, session_config=None):
         self.model_path = model_path
+        if session_config is None:
+            session_config = {}
 
         providers = list(
             set(ort.get_available_providers())
             & {"CUDAExecutionProvider", "CPUExecutionProvider"}
         )
-        self.sess = ort.InferenceSession(
-            self.model_path,
-            providers=providers,
-        )
-        self.output_name = self.sess.get_outputs()[0].name
+        self.sess = self._create_session(providers, **session_config)
+        output = self.sess.get_outputs()[0]
+        self.output_name = output.name
 
         input_ = self.sess.get_inputs()[0]
         self.input_name = input_.name
         self.model_height, self.model_width = input_.shape[2:]
+        self.input_buffer = None
+        self._input_size = None
+        self._letterboxes = {}
 
-    def resize(self, x):
-        ratio = x.height / x.width
-        if ratio > self.model_height / self.model_width:
-            height = self.model_height
-            width = int(self.model_height / ratio)
-        else:
-            width = self.model_width
-            height = int(self.model_width * ratio)
+        # Outputs with a fixed shape are written into the same buffer on
+        # every run, the others are allocated by onnxruntime
+        self.io_binding = self.sess.io_binding()
+        self.output = None
+        if output.type in self.TENSOR_TYPES and all(
+            isinstance(i, int) for i in output.shape
+        ):
+            self.output = np.empty(
+                output.shape, dtype=self.TENSOR_TYPES[output.type]
+            )
+            self._output_value = ort.OrtValue.ortvalue_from_numpy(self.output)
+            self.io_binding.bind_ortvalue_output(
+                self.output_name, self._output_value
+            )
 
-        x = x.resize((width, height))
-        return x
+    def _get_optimized_model_path(self, providers, optimization_level):
+        """
+        Where the optimized model is cached. Optimized graphs can contain
+        provider specific nodes, so each provider gets its own copy.
+        """
+        name = os.path.splitext(os.path.basename(self.model_path))[0]
+        device = "cuda" if "CUDAExecutionProvider" in providers else "cpu"
+        return os.path.join(
+            OPTIMIZED_MODELS_DIR, f"{name}.{device}.{optimization_level}.onnx"
+        )
+
+    def _create_session(
+        self,
+        providers,
+        intra_op_threads=0,
+        inter_op_threads=0,
+        execution_mode="sequential",
+        optimization_level="all",
+        cache_optimized_model=False,
+    ):
+        if execution_mode not in self.EXECUTION_MODES:
+            logger.warning(
+                f"Unknown execution mode '{execution_mode}', using 'sequential'"
+            )
+            execution_mode = "sequential"
+        if optimization_level not in self.OPTIMIZATION_LEVELS:
+            logger.warning(
+                f"Unknown optimization level '{optimization_level}', "
+                "using 'all'"
+            )
+            optimization_level = "all"
 
-    def pad(self, x):
-        height, width = x.shape[:2]
-        dx = self.model_width - width
-        dy = self.model_height - height
-        pad_right = dx // 2
-        pad_left = dx - pad_right
-        pad_bottom = dy // 2
-        pad_top = dy - pad_bottom
-        padding = [pad_left, pad_right, pad_top, pad_bottom]
-        x = np.pad(
-            x,
-            ((pad_top, pad_bottom), (pad_left, pad_right), (0, 0)),
-            mode="constant",
-            constant_values=114,
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = intra_op_threads
+        options.inter_op_num_threads = inter_op_threads
+        options.execution_mode = self.EXECUTION_MODES[execution_mode]
+        options.graph_optimization_level = self.OPTIMIZATION_LEVELS[
+            optimization_level
+        ]
+
+        model_path = self.model_path
+        if cache_optimized_model:
+            optimized_path = self._get_optimized_model_path(
+                providers, optimization_level
+            )
+            if os.path.exists(optimized_path) and os.path.getmtime(
+                optimized_path
+            ) >= os.path.getmtime(self.model_path):
+                # Already optimized, so skip the optimization passes
+                logger.debug(f"Using optimized model {optimized_path}")
+                model_path = optimized_path
+                options.graph_optimization_level = self.OPTIMIZATION_LEVELS[
+                    "disable"
+                ]
+            else:
+                os.makedirs(OPTIMIZED_MODELS_DIR, exist_ok=True)
+                options.optimized_model_filepath = optimized_path
+
+        return ort.InferenceSession(
+            model_path,
+            sess_options=options,
+            providers=providers,
         )
-        return x, padding
+
+    def _get_letterbox(self, width, height):
+        """The resized size and the padding for an input size, cached"""
+        key = (width, height)
+        if key not in self._letterboxes:
+            ratio = height / width
+            if ratio > self.model_height / self.model_width:
+                resized_height = self.model_height
+                resized_width = int(self.model_height / ratio)
+            else:
+                resized_width = self.model_width
+                resized_height = int(self.model_width * ratio)
+
+            dx = self.model_width - resized_width
+            dy = self.model_height - resized_height
+            pad_right = dx // 2
+            pad_left = dx - pad_right
+            pad_bottom = dy // 2
+            pad_top = dy - pad_bottom
+            padding = [pad_left, pad_right, pad_top, pad_bottom]
+            self._letterboxes[key] = (resized_width, resized_height), padding
+        return self._letterboxes[key]
 
     def resize_pad_transpose_and_scale(self, image):
-        image = self.resize(image)
-        image = np.array(image, dtype=np.float16)
-        image, padding = self.pad(image)
-        image = image.transpose(2, 0, 1)
-        image /= 255
-        return image, padding
+        """
+        Letterbox the image into the model input buffer, which is returned
+        with shape (1, 3, H, W). The buffer is reused by the next call.
+        """
+        size, padding = self._get_letterbox(image.width, image.height)
+        if self.input_buffer is None or self._input_size != size:
+            # The padding only changes with the input size
+            self.input_buffer = np.full(
+                (1, 3, self.model_height, self.model_width),
+                self.SCALE_LUT[self.PAD_VALUE],
+                dtype=np.float16,
+            )
+            self._input_size = size
+
+        pad_left, _, pad_top, _ = padding
+        width, height = size
+        pixels = np.asarray(image.resize(size))
+        self.input_buffer[
+            0, :, pad_top : pad_top + height, pad_left : pad_left + width
+        ] = self.SCALE_LUT[pixels].transpose(2, 0, 1)
+        return self.input_buffer, padding
 
     def fix_bboxes(self, x, width, height, padding):
         x[:, [0, 2]] -= padding[0]
@@ -67,7 +180,19 @@ class OnnxDetector:
         return x
 
     def _infer(self, x):
-        return self.sess.run([self.output_name], {self.input_name: x})[0]
+        """
+        Run the model on x. Fixed size outputs are returned in a buffer
+        that the next call overwrites, so copy them to keep them.
+        """
+        self.io_binding.bind_cpu_input(
+            self.input_name, np.ascontiguousarray(x)
+        )
+        if self.output is None:
+            self.io_binding.bind_output(self.output_name)
+        self.sess.run_with_iobinding(self.io_binding)
+        if self.output is None:
+            return self.io_binding.copy_outputs_to_cpu()[0]
+        return self.output
 
     def run(self, image):
         raise NotImplementedError
@@ -9,10 +9,18 @@ from clashroyalebuildabot.namespaces.screens import Screen
 
 
 class ScreenDetector:
-    def __init__(self, hash_size=8, threshold=30):
+    def __init__(self, hash_size=8, threshold=30, early_exit_threshold=10):
         self.hash_size = hash_size
         self.threshold = threshold
+        self.early_exit_threshold = early_exit_threshold
+        self.screens = [
+            screen
+            for screen in Screens.__dict__.values()
+            if screen.ltrb is not None
+        ]
         self.screen_hashes = self._calculate_screen_hashes()
+        self.previous_screen = Screens.UNKNOWN
+        self._rois = {}
 
     def _image_hash(self, image):
         crop = image.resize(
@@ -22,35 +30,53 @@ class ScreenDetector:
         return hash_
 
     def _calculate_screen_hashes(self):
-        screen_hashes = {}
-        for screen in Screens.__dict__.values():
-            if screen.ltrb is None:
-                continue
+        """One row per screen, in the same order as self.screens"""
+        screen_hashes = []
+        for screen in self.screens:
             path = os.path.join(IMAGES_DIR, "screen", f"{screen.name}.jpg")
             image = Image.open(path)
-            screen_hashes[screen] = self._image_hash(image)
-        return screen_hashes
+            screen_hashes.append(self._image_hash(image))
+        return np.stack(screen_hashes)
+
+    def _get_rois(self, size):
+        """The region of each screen at this image size, computed once"""
+        if size not in self._rois:
+            # screen.ltrb are dimensions scaled to 720x1280 so we scale them
+            self._rois[size] = [
+                (
+                    int(screen.ltrb[0] * size[0] / 720),
+                    int(screen.ltrb[1] * size[1] / 1280),
+                    int(screen.ltrb[2] * size[0] / 720),
+                    int(screen.ltrb[3] * size[1] / 1280),
+                )
+                for screen in self.screens
+            ]
+        return self._rois[size]
+
+    def _is_previous_screen(self, image, rois):
+        """
+        Whether the image still clearly shows the previous screen, which
+        is almost always the case and only needs one region hashed
+        """
+        if self.previous_screen not in self.screens:
+            return False
+        i = self.screens.index(self.previous_screen)
+        hash_ = self._image_hash(image.crop(rois[i]))
+        diff = np.mean(np.abs(hash_ - self.screen_hashes[i]))
+        return diff < self.early_exit_threshold
 
     def run(self, image: Image) -> Screen:
-        current_screen = Screens.UNKNOWN
-        best_diff = self.threshold
-
-        for screen in Screens.__dict__.values():
-            if screen.ltrb is None:
-                continue
-            # screen.ltb are dimensions scaled to 720x1280 so we scale them :
-            treated_ltrb = (
-                int(screen.ltrb[0] * image.size[0] / 720),
-                int(screen.ltrb[1] * image.size[1] / 1280),
-                int(screen.ltrb[2] * image.size[0] / 720),
-                int(screen.ltrb[3] * image.size[1] / 1280),
-            )
-            hash_ = self._image_hash(image.crop(treated_ltrb))
-            target_hash = self.screen_hashes[screen]
-
-            diff = np.mean(np.abs(hash_ - target_hash))
-            if diff < best_diff:
-                best_diff = diff
-                current_screen = screen
+        rois = self._get_rois(image.size)
+        if self._is_previous_screen(image, rois):
+            return self.previous_screen
+
+        hashes = np.stack([self._image_hash(image.crop(roi)) for roi in rois])
+        diffs = np.mean(np.abs(hashes - self.screen_hashes), axis=1)
+        best = np.argmin(diffs)
+        if diffs[best] < self.threshold:
+            current_screen = self.screens[best]
+        else:
+            current_screen = Screens.UNKNOWN
 
+        self.previous_screen = current_screen
         return current_screen
@@ -6,19 +6,47 @@ from clashroyalebuildabot.detectors.onnx_detector import OnnxDetector
 
 class SideDetector(OnnxDetector):
     SIDE_SIZE = 16
+    MAX_BATCH_SIZE = 32
 
-    def _preprocess(self, image):
-        image = image.resize(
-            (self.SIDE_SIZE, self.SIDE_SIZE), Image.Resampling.BICUBIC
+    def __init__(self, model_path, session_config=None):
+        super().__init__(model_path, session_config)
+        # Models exported with a fixed batch size get padded batches
+        batch_size = self.sess.get_inputs()[0].shape[0]
+        self.fixed_batch = isinstance(batch_size, int) and batch_size > 0
+        self.batch_size = (
+            batch_size if self.fixed_batch else self.MAX_BATCH_SIZE
         )
-        image = np.array(image, dtype=np.float32) / 255
-        return np.expand_dims(image, axis=0)
+        self.batch = np.zeros(
+            (self.batch_size, self.SIDE_SIZE, self.SIDE_SIZE, 3),
+            dtype=np.float32,
+        )
+
+    def _preprocess(self, images):
+        """Resize the images into the start of the preallocated batch"""
+        batch = self.batch[: len(images)]
+        for i, image in enumerate(images):
+            image = image.resize(
+                (self.SIDE_SIZE, self.SIDE_SIZE), Image.Resampling.BICUBIC
+            )
+            batch[i] = np.asarray(image)
+        batch /= 255
+        return batch
 
     @staticmethod
     def _post_process(pred):
-        return ("ally", "enemy")[np.argmax(pred[0])]
+        return [("ally", "enemy")[i] for i in np.argmax(pred, axis=1)]
+
+    def run_batch(self, images):
+        """Classify the side of each image with one inference per batch"""
+        sides = []
+        for start in range(0, len(images), self.batch_size):
+            chunk = images[start : start + self.batch_size]
+            batch = self._preprocess(chunk)
+            if self.fixed_batch:
+                batch = self.batch
+            pred = self._infer(batch)[: len(chunk)]
+            sides.extend(self._post_process(pred))
+        return sides
 
     def run(self, image):
-        image = self._preprocess(image)
-        pred = self._infer(image)
-        return self._post_process(pred)
+        return self.run_batch([image])[0]
@@ -0,0 +1,155 @@
+from typing import List
+
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+from clashroyalebuildabot.constants import DISPLAY_HEIGHT
+from clashroyalebuildabot.constants import DISPLAY_WIDTH
+from clashroyalebuildabot.constants import SCREENSHOT_HEIGHT
+from clashroyalebuildabot.constants import SCREENSHOT_WIDTH
+from clashroyalebuildabot.constants import TILE_HEIGHT
+from clashroyalebuildabot.constants import TILE_INIT_X
+from clashroyalebuildabot.constants import TILE_INIT_Y
+from clashroyalebuildabot.constants import TILE_WIDTH
+from clashroyalebuildabot.namespaces.units import Track
+from clashroyalebuildabot.namespaces.units import UnitEvent
+
+
+def get_tile_position(bbox):
+    """The unrounded tile coordinates of the bottom centre of a bbox"""
+    x = (bbox[0] + bbox[2]) * DISPLAY_WIDTH / (2 * SCREENSHOT_WIDTH)
+    y = bbox[3] * DISPLAY_HEIGHT / SCREENSHOT_HEIGHT
+    tile_x = (x - TILE_INIT_X) / TILE_WIDTH - 0.5
+    tile_y = (DISPLAY_HEIGHT - TILE_INIT_Y - y) / TILE_HEIGHT - 0.5
+    return np.array([tile_x, tile_y])
+
+
+def get_iou(a, b):
+    width = min(a[2], b[2]) - max(a[0], b[0])
+    height = min(a[3], b[3]) - max(a[1], b[1])
+    if width <= 0 or height <= 0:
+        return 0.0
+    intersection = width * height
+    union = (
+        (a[2] - a[0]) * (a[3] - a[1])
+        + (b[2] - b[0]) * (b[3] - b[1])
+        - intersection
+    )
+    return intersection / union if union > 0 else 0.0
+
+
+class UnitTracker:
+    """
+    Follows units across frames so each one keeps the same track ID.
+
+    Detections are matched to the tracks of the same side and unit type,
+    by overlap with the last bbox or by distance to where the track was
+    predicted to be. Positions and velocities, in tiles and tiles per
+    second, are smoothed with a constant-velocity alpha-beta filter.
+
+    A track is only reported as deployed once it has been seen in
+    MIN_HITS frames, so one-frame false detections don't produce events,
+    and it is reported as died once it has been missing for MAX_MISSING
+    seconds.
+    """
+
+    MIN_HITS = 2
+    MAX_MISSING = 0.5
+    MIN_IOU = 0.3
+    MAX_DISTANCE = 2.0
+    ALPHA = 0.6
+    BETA = 0.2
+
+    def __init__(self):
+        self.tracks: List[Track] = []
+        self._next_id = 1
+
+    def reset(self):
+        self.tracks = []
+
+    @property
+    def confirmed_tracks(self) -> List[Track]:
+        return [track for track in self.tracks if track.confirmed]
+
+    def _match_cost(self, track, detection, timestamp):
+        predicted = track.position + track.velocity * (
+            timestamp - track.last_seen
+        )
+        distance = np.linalg.norm(
+            get_tile_position(detection.position.bbox) - predicted
+        )
+        iou = get_iou(track.detection.position.bbox, detection.position.bbox)
+        if iou < self.MIN_IOU and distance > self.MAX_DISTANCE:
+            return None
+        return distance / self.MAX_DISTANCE - iou
+
+    def _associate(self, tracks, detections, timestamp):
+        """Pairs of (track index, detection index) with the lowest cost"""
+        if not tracks or not detections:
+            return []
+        # Pairs that are too far apart or of different units can't match
+        invalid = 1e6
+        costs = np.full((len(tracks), len(detections)), invalid)
+        for i, track in enumerate(tracks):
+            for j, detection in enumerate(detections):
+                if track.name != detection.unit.name:
+                    continue
+                cost = self._match_cost(track, detection, timestamp)
+                if cost is not None:
+                    costs[i, j] = cost
+        rows, cols = linear_sum_assignment(costs)
+        return [(i, j) for i, j in zip(rows, cols) if costs[i, j] < invalid]
+
+    def _update_track(self, track, detection, timestamp):
+        dt = timestamp - track.last_seen
+        measured = get_tile_position(detection.position.bbox)
+        predicted = track.position + track.velocity * dt
+        residual = measured - predicted
+        track.position = predicted + self.ALPHA * residual
+        if dt > 0:
+            track.velocity = track.velocity + self.BETA * residual / dt
+        track.detection = detection
+        track.last_seen = timestamp
+        track.hits += 1
+
+    def _update_side(self, side, detections, timestamp):
+        tracks = [track for track in self.tracks if track.side == side]
+        matches = self._associate(tracks, detections, timestamp)
+        for i, j in matches:
+            self._update_track(tracks[i], detections[j], timestamp)
+
+        matched = {j for _, j in matches}
+        for j, detection in enumerate(detections):
+            if j in matched:
+                continue
+            self.tracks.append(
+                Track(
+                    self._next_id,
+                    side,
+                    detection,
+                    get_tile_position(detection.position.bbox),
+                    np.zeros(2),
+                    timestamp,
+                    timestamp,
+                )
+            )
+            self._next_id += 1
+
+    def update(self, allies, enemies, timestamp) -> List[UnitEvent]:
+        """Match one frame of detections and return what changed"""
+        self._update_side("ally", allies, timestamp)
+        self._update_side("enemy", enemies, timestamp)
+
+        events = []
+        tracks = []
+        for track in self.tracks:
+            if timestamp - track.last_seen > self.MAX_MISSING:
+                if track.confirmed:
+                    events.append(UnitEvent(UnitEvent.DIED, track, timestamp))
+                continue
+            if not track.confirmed and track.hits >= self.MIN_HITS:
+                track.confirmed = True
+                events.append(UnitEvent(UnitEvent.DEPLOYED, track, timestamp))
+            tracks.append(track)
+        self.tracks = tracks
+        return events
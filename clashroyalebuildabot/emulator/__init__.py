@@ -1,3 +1,4 @@
 from .emulator import Emulator
+from .replay_emulator import ReplayEmulator
 
-__all__ = ["Emulator"]
+__all__ = ["Emulator", "ReplayEmulator"]
@@ -0,0 +1,108 @@
+import queue
+import subprocess
+import threading
+import time
+
+from loguru import logger
+
+from clashroyalebuildabot.constants import ADB_PATH
+from clashroyalebuildabot.constants import EMULATOR_DIR
+from error_handling import WikifiedError
+
+
+class AdbShell:
+    """
+    A long-lived `adb shell` session.
+
+    Commands are written to the shell's stdin and acknowledged with a
+    marker line, so running one doesn't pay for starting an adb process.
+    """
+
+    ACK_TIMEOUT = 2
+
+    def __init__(self, device_serial):
+        self.device_serial = device_serial
+        self.process = None
+        self._lines = None
+        self._lock = threading.Lock()
+        self._n_commands = 0
+
+    def _start(self):
+        logger.debug(f"Starting persistent adb shell on {self.device_serial}")
+        self.process = subprocess.Popen(
+            [ADB_PATH, "-s", self.device_serial, "shell", "-T"],
+            cwd=EMULATOR_DIR,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            bufsize=1,
+        )
+        self._lines = queue.Queue()
+        reader = threading.Thread(
+            target=self._read_lines, args=(self.process, self._lines)
+        )
+        reader.daemon = True
+        reader.start()
+
+    @staticmethod
+    def _read_lines(process, lines):
+        for line in iter(process.stdout.readline, ""):
+            lines.put(line.rstrip("\r\n"))
+        lines.put(None)
+
+    def is_alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    def close(self):
+        if self.process is None:
+            return
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+        self.process.kill()
+        self.process = None
+
+    def _wait_for_ack(self, marker):
+        output = []
+        deadline = time.time() + self.ACK_TIMEOUT
+        while True:
+            try:
+                line = self._lines.get(timeout=max(deadline - time.time(), 0))
+            except queue.Empty as e:
+                raise TimeoutError(
+                    f"No reply from adb shell in {self.ACK_TIMEOUT} seconds"
+                ) from e
+            if line is None:
+                raise ConnectionError("adb shell exited")
+            if line.startswith(marker):
+                return int(line.split()[-1]), output
+            output.append(line)
+
+    def run(self, command):
+        with self._lock:
+            start_time = time.time()
+            self._n_commands += 1
+            marker = f"__crbab_done_{self._n_commands}__"
+            try:
+                if not self.is_alive():
+                    self._start()
+                self.process.stdin.write(f"{command}; echo {marker} $?\n")
+                self.process.stdin.flush()
+                returncode, output = self._wait_for_ack(marker)
+            except (OSError, TimeoutError, ConnectionError) as e:
+                logger.warning(f"Persistent adb shell failed: {str(e)}")
+                self.close()
+                raise WikifiedError("007", "ADB command failed.") from e
+
+            logger.debug(
+                f"{command} executed in {time.time() - start_time} seconds"
+            )
+            output = "\n".join(output)
+            if returncode != 0:
+                logger.error(f"Error executing command: {output}")
+                raise WikifiedError(
+                    "007", "ADB command failed."
+                ) from RuntimeError(output)
+            return output
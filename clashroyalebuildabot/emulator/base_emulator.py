@@ -0,0 +1,121 @@
+from dataclasses import dataclass
+import time
+from typing import Optional
+
+from loguru import logger
+import numpy as np
+from PIL.Image import Image
+
+from clashroyalebuildabot.constants import SCREENSHOT_HEIGHT
+from clashroyalebuildabot.constants import SCREENSHOT_WIDTH
+from clashroyalebuildabot.emulator.frame_buffer import Frame
+from clashroyalebuildabot.emulator.frame_buffer import FrameRingBuffer
+
+
+@dataclass
+class DecodeStats:
+    decoded: int = 0
+    dropped: int = 0
+    corrupt: int = 0
+    longest_gap: float = 0.0
+    stale: int = 0
+    decode_time: float = 0.0
+
+    def add_decode_time(self, seconds, smoothing=0.1):
+        """Track a moving average of the time it takes to decode a frame"""
+        if self.decode_time == 0.0:
+            self.decode_time = seconds
+        else:
+            self.decode_time += smoothing * (seconds - self.decode_time)
+
+
+class BaseEmulator:
+    """
+    The frame pipeline shared by every emulator: decoded video frames are
+    scaled into a ring buffer, and the bot takes them from there.
+    Subclasses feed frames in and implement the input methods.
+    """
+
+    FRAME_BUFFER_SIZE = 8
+
+    def __init__(self):
+        self.decode_stats = DecodeStats()
+        self._last_publish_time = None
+        self.frames = FrameRingBuffer(
+            self.FRAME_BUFFER_SIZE, SCREENSHOT_HEIGHT, SCREENSHOT_WIDTH
+        )
+
+    def _publish_frame(self, av_frame, timestamp=None):
+        """
+        Scale the frame into the ring buffer and publish it, stamped with
+        the given time or, by default, the time it was published at
+        """
+        # Only scale here, colour conversion is left to whoever needs it
+        yuv_frame = av_frame.reformat(
+            width=SCREENSHOT_WIDTH,
+            height=SCREENSHOT_HEIGHT,
+            format="yuv420p",
+        )
+        for plane, slot in zip(yuv_frame.planes, self.frames.next_slot()):
+            # Rows can be padded, so only keep the pixels of each line
+            pixels = np.frombuffer(plane, dtype=np.uint8).reshape(
+                -1, plane.line_size
+            )
+            np.copyto(slot, pixels[: slot.shape[0], : slot.shape[1]])
+
+        if timestamp is None:
+            timestamp = time.time()
+        if self._last_publish_time is not None:
+            self.decode_stats.longest_gap = max(
+                self.decode_stats.longest_gap,
+                timestamp - self._last_publish_time,
+            )
+        self._last_publish_time = timestamp
+        self.frames.publish(timestamp)
+
+    def reset_longest_frame_gap(self):
+        """Return the longest gap between frames so far and start over"""
+        longest_gap = self.decode_stats.longest_gap
+        self.decode_stats.longest_gap = 0.0
+        return longest_gap
+
+    def get_frame(self, after_seq=0, pin=False) -> Optional[Frame]:
+        """The newest frame with a sequence number above after_seq, if any"""
+        return self.frames.latest(after_seq, pin)
+
+    def wait_for_frame(
+        self, after_seq=0, timeout=None, pin=False
+    ) -> Optional[Frame]:
+        """
+        Wait until the decoder publishes a frame newer than after_seq.
+        Returns None if no such frame arrives within the timeout.
+
+        A pinned frame isn't written over by the decoder, however long it
+        takes to process, until it is given back with release_frame.
+        """
+        return self.frames.wait(after_seq, timeout, pin)
+
+    def release_frame(self, frame):
+        self.frames.release(frame)
+
+    def take_frame(self, after_seq=0) -> Frame:
+        logger.debug("Starting to take frame...")
+        return self.wait_for_frame(after_seq)
+
+    def take_screenshot(self, after_seq=0) -> Image:
+        return self.take_frame(after_seq).to_image()
+
+    def click(self, x, y):
+        raise NotImplementedError
+
+    def place_card(self, card_xy, tile_xy, swipe=False):
+        raise NotImplementedError
+
+    def start_game(self):
+        raise NotImplementedError
+
+    def stop_game(self):
+        raise NotImplementedError
+
+    def load_deck(self, cards):
+        raise NotImplementedError
@@ -1,6 +1,7 @@
 # pylint: disable=consider-using-with
 
 import base64
+import math
 import os
 import platform
 import subprocess
@@ -10,35 +11,70 @@ import zipfile
 
 import av
 from loguru import logger
-from PIL.Image import Image
 import requests
 from tqdm import tqdm
 
 from clashroyalebuildabot.constants import ADB_DIR
 from clashroyalebuildabot.constants import ADB_PATH
 from clashroyalebuildabot.constants import EMULATOR_DIR
-from clashroyalebuildabot.constants import SCREENSHOT_HEIGHT
 from clashroyalebuildabot.constants import SCREENSHOT_WIDTH
+from clashroyalebuildabot.emulator.adb_shell import AdbShell
+from clashroyalebuildabot.emulator.base_emulator import BaseEmulator
 from error_handling import WikifiedError
 
 
-class Emulator:
-    def __init__(self, device_serial, ip):
+class Emulator(BaseEmulator):
+    CAPTURE_MODES = ("detector", "device")
+    DECODE_MODES = ("latency", "throughput", "default")
+    CAPTURE_ALIGNMENT = 16
+    DEVICE_BIT_RATE = "5M"
+    DETECTOR_BIT_RATE = "2M"
+    SWIPE_DURATION_MS = 100
+    READ_CHUNK_SIZE = 64 * 1024
+    RECORDING_TIME_LIMIT = 179
+    RECORDING_OVERLAP = 5
+    RECORDING_RESTART_DELAY = 1
+    STALE_FRAME_LIMIT = 0.25
+
+    def __init__(
+        self,
+        device_serial,
+        ip,
+        capture_mode="detector",
+        decode_mode="latency",
+        decode_threads=0,
+    ):
+        super().__init__()
         self.device_serial = device_serial
         self.ip = ip
+        if capture_mode not in self.CAPTURE_MODES:
+            logger.warning(
+                f"Unknown capture mode '{capture_mode}', using 'detector'"
+            )
+            capture_mode = "detector"
+        self.capture_mode = capture_mode
+        if decode_mode not in self.DECODE_MODES:
+            logger.warning(
+                f"Unknown decode mode '{decode_mode}', using 'latency'"
+            )
+            decode_mode = "latency"
+        self.decode_mode = decode_mode
+        self.decode_threads = decode_threads
 
         self.frame_thread = None
         self.video_thread = None
-        self.frame = None
-        self.codec = av.codec.CodecContext.create("h264", "r")
+        self.recording_generation = 0
+        self._publish_lock = threading.Lock()
         self.os_name = platform.system().lower()
 
         self._install_adb()
         self._restart_server()
         self.device_serial = self._get_valid_device_serial()
+        self.input_shell = AdbShell(self.device_serial)
         self.width, self.height = self._get_width_and_height()
+        self.capture_width, self.capture_height = self._get_capture_size()
+        self.frame_size = None
         self._start_recording()
-        self._start_updating_frame()
 
     def _get_valid_device_serial(self):
         # Se device_serial for 'auto', pular direto para detecção automática
@@ -92,25 +128,115 @@ class Emulator:
                 "006", "Could not find a valid device to connect to."
             ) from adb_error
 
-    def _start_recording(self):
-        cmd = (
-            f"""#!/bin/bash
-            while true; do
-                screenrecord --output-format=h264 --time-limit "179" """
-            f"""--size "{self.width}x{self.height}" --bit-rate "5M" -
-            done\n"""
+    def _get_capture_size(self):
+        if self.capture_mode == "device":
+            return self.width, self.height
+
+        # screenrecord pads any size that doesn't have the display's aspect
+        # ratio with black bars, and hardware encoders work on 16x16
+        # macroblocks. So take the smallest size with exactly the device's
+        # aspect ratio, both sides multiples of 16 and at least as wide as
+        # the detector resolution
+        divisor = math.gcd(self.width, self.height)
+        step_width = self.width // divisor * self.CAPTURE_ALIGNMENT
+        step_height = self.height // divisor * self.CAPTURE_ALIGNMENT
+        steps = -(-SCREENSHOT_WIDTH // step_width)
+        width, height = step_width * steps, step_height * steps
+        if width > self.width:
+            # No size smaller than the device keeps the aspect ratio
+            width, height = self.width, self.height
+        logger.info(
+            f"Requesting {width}x{height} frames from screenrecord "
+            f"(device is {self.width}x{self.height})"
+        )
+        return width, height
+
+    @classmethod
+    def _get_screenrecord_cmd(cls, width, height, bit_rate):
+        return (
+            "screenrecord --output-format=h264 "
+            f'--time-limit "{cls.RECORDING_TIME_LIMIT}" '
+            f'--size "{width}x{height}" --bit-rate "{bit_rate}" -'
+        )
+
+    def _start_screenrecord(self):
+        record_cmd = self._get_screenrecord_cmd(
+            self.width, self.height, self.DEVICE_BIT_RATE
         )
+        if (self.capture_width, self.capture_height) != (
+            self.width,
+            self.height,
+        ):
+            # Some encoders reject sizes that aren't native to the panel,
+            # in which case screenrecord exits straight away and we fall
+            # back to recording at the device resolution
+            small_record_cmd = self._get_screenrecord_cmd(
+                self.capture_width,
+                self.capture_height,
+                self.DETECTOR_BIT_RATE,
+            )
+            record_cmd = f"{small_record_cmd} || {record_cmd}"
+
+        cmd = f"""#!/bin/bash
+            {record_cmd}\n"""
         cmd = base64.standard_b64encode(cmd.encode("utf-8")).decode("utf-8")
         cmd = ["echo", cmd, "|", "base64", "-d", "|", "sh"]
         cmd = " ".join(cmd) + "\n"
-        self.video_thread = subprocess.Popen(
-            [ADB_PATH, "-s", self.device_serial, "shell", cmd],
+        return subprocess.Popen(
+            [ADB_PATH, "-s", self.device_serial, "exec-out", cmd],
             stderr=subprocess.DEVNULL,
             stdout=subprocess.PIPE,
             stdin=subprocess.DEVNULL,
             bufsize=0,
         )
 
+    def _record(self):
+        """
+        Keep screenrecord running without gaps.
+
+        A recording stops after RECORDING_TIME_LIMIT seconds, so the next
+        one is started RECORDING_OVERLAP seconds before that. Each
+        recording gets its own decoder, and frames from an older
+        recording are ignored once the newer one produces a frame.
+        """
+        generation = 0
+        while True:
+            generation += 1
+            process = self._start_screenrecord()
+            self.video_thread = process
+            reader = threading.Thread(
+                target=self._update_frame,
+                args=(process, self._create_codec(), generation),
+            )
+            reader.daemon = True
+            reader.start()
+
+            try:
+                process.wait(
+                    timeout=self.RECORDING_TIME_LIMIT - self.RECORDING_OVERLAP
+                )
+                logger.debug("Screen recording ended early, restarting it")
+                time.sleep(self.RECORDING_RESTART_DELAY)
+            except subprocess.TimeoutExpired:
+                logger.debug("Starting the next screen recording")
+
+    def _start_recording(self):
+        self.frame_thread = threading.Thread(target=self._record)
+        self.frame_thread.daemon = True
+        self.frame_thread.start()
+
+    def _create_codec(self):
+        codec = av.codec.CodecContext.create("h264", "r")
+        if self.decode_mode == "latency":
+            # Slice threads don't hold frames back like frame threads do
+            codec.thread_type = "SLICE"
+            codec.options = {"flags": "low_delay", "flags2": "fast"}
+        elif self.decode_mode == "throughput":
+            codec.thread_type = "FRAME"
+        if self.decode_threads:
+            codec.thread_count = self.decode_threads
+        return codec
+
     def _install_adb(self):
         if os.path.isdir(ADB_DIR):
             return
@@ -179,66 +305,110 @@ class Emulator:
         )
         self._run_command(["start-server"])
 
-    def _update_frame(self):
-        logger.debug("Starting to update frames...")
-        invalid_frame_count = 0
+    def _update_frame(self, process, codec, generation):
+        logger.debug(f"Starting to update frames from recording {generation}")
+        fd = process.stdout.fileno()
         last_warning_time = 0
-        
-        for line in iter(self.video_thread.stdout.readline, b""):
-            try:
-                last_frame = self._get_last_frame(line)
-                if not last_frame:
-                    continue
 
-                self.frame = last_frame.reformat(
-                    width=SCREENSHOT_WIDTH,
-                    height=SCREENSHOT_HEIGHT,
-                    format="rgb24",
-                ).to_image()
-                
-                # Reset contador quando conseguimos um frame válido
-                invalid_frame_count = 0
-
-            except av.error.InvalidDataError as av_error:
-                invalid_frame_count += 1
-                current_time = time.time()
-                
-                # Log apenas a cada 10 segundos ou a cada 100 frames inválidos
-                if (current_time - last_warning_time > 10) or (invalid_frame_count % 100 == 0):
-                    logger.debug(f"Video data issues detected ({invalid_frame_count} invalid frames). This is normal with BlueStacks.")
-                    last_warning_time = current_time
-                continue
-                
-            except Exception as e:
-                logger.debug(f"Frame processing error: {str(e)}")
+        while True:
+            if generation < self.recording_generation:
+                logger.debug(f"Recording {generation} superseded, stopping it")
+                process.kill()
+                break
+
+            chunk = os.read(fd, self.READ_CHUNK_SIZE)
+            if not chunk:
+                logger.debug(f"Recording {generation} stream ended")
+                break
+
+            n_corrupt = self.decode_stats.corrupt
+            last_frame = self._decode_chunk(codec, chunk)
+
+            current_time = time.time()
+            if (
+                self.decode_stats.corrupt > n_corrupt
+                and current_time - last_warning_time > 10
+            ):
+                logger.debug(
+                    f"Video data issues detected ({self.decode_stats}). "
+                    "This is normal with BlueStacks."
+                )
+                last_warning_time = current_time
+
+            if last_frame is None:
                 continue
 
-    def _get_last_frame(self, line):
-        if not line:
-            return None
+            # A full chunk means more video is already waiting in the pipe,
+            # so this frame is stale. Skip it unless we'd leave the bot
+            # without a new frame for too long.
+            if (
+                len(chunk) == self.READ_CHUNK_SIZE
+                and self._last_publish_time is not None
+                and current_time - self._last_publish_time
+                < self.STALE_FRAME_LIMIT
+            ):
+                self.decode_stats.stale += 1
+                continue
 
+            with self._publish_lock:
+                if generation < self.recording_generation:
+                    continue
+                if generation > self.recording_generation:
+                    logger.debug(
+                        f"Switching to frames from recording {generation}"
+                    )
+                    self.recording_generation = generation
+
+                frame_size = (last_frame.width, last_frame.height)
+                if frame_size != self.frame_size:
+                    logger.info(
+                        f"Receiving {frame_size[0]}x{frame_size[1]} frames "
+                        "from screenrecord"
+                    )
+                    self.frame_size = frame_size
+
+                try:
+                    self._publish_frame(last_frame)
+                except Exception as e:
+                    logger.debug(f"Frame processing error: {str(e)}")
+
+    def _decode_chunk(self, codec, chunk):
+        """
+        Feed a chunk of the H.264 stream to the decoder.
+        Every packet is decoded, but only the newest frame is returned.
+        """
         try:
-            if self.os_name == "windows":
-                line = line.replace(b"\r\n", b"\n")
-
-            packets = self.codec.parse(line)
-            if not packets:
-                return None
-
-            frames = self.codec.decode(packets[-1])
-            if not frames:
-                return None
-            return frames[-1]
-        except Exception as e:
-            # Log apenas erros inesperados, não os comuns de vídeo
-            if "Invalid data" not in str(e) and "no frame" not in str(e):
-                logger.debug(f"Frame parsing error: {str(e)}")
+            packets = codec.parse(chunk)
+        except av.error.InvalidDataError:
+            self.decode_stats.corrupt += 1
             return None
 
-    def _start_updating_frame(self):
-        self.frame_thread = threading.Thread(target=self._update_frame)
-        self.frame_thread.daemon = True
-        self.frame_thread.start()
+        last_frame = None
+        n_frames = 0
+        start_time = time.perf_counter()
+        for packet in packets:
+            try:
+                frames = codec.decode(packet)
+            except av.error.InvalidDataError:
+                self.decode_stats.corrupt += 1
+                continue
+            except Exception as e:
+                logger.debug(f"Frame decoding error: {str(e)}")
+                self.decode_stats.corrupt += 1
+                continue
+
+            for frame in frames:
+                n_frames += 1
+                if last_frame is not None:
+                    self.decode_stats.dropped += 1
+                last_frame = frame
+
+        if n_frames:
+            self.decode_stats.decoded += n_frames
+            self.decode_stats.add_decode_time(
+                (time.perf_counter() - start_time) / n_frames
+            )
+        return last_frame
 
     def _get_width_and_height(self):
         # Add a small delay to ensure device is ready
@@ -278,18 +448,33 @@ class Emulator:
             ]
         )
 
-    def click(self, x, y):
-        self._run_command(["shell", "input", "tap", str(x), str(y)])
-
-    def take_screenshot(self) -> Image:
-        logger.debug("Starting to take screenshot...")
-        while self.frame is None:
-            time.sleep(0.01)
-            continue
-
-        screenshot, self.frame = self.frame, None
+    def _run_input(self, *commands):
+        command = "; ".join(
+            " ".join(["input", *[str(arg) for arg in args]])
+            for args in commands
+        )
+        try:
+            self.input_shell.run(command)
+        except WikifiedError:
+            logger.warning("Retrying input with a one-off adb command")
+            self._run_command(["shell", command])
 
-        return screenshot
+    def click(self, x, y):
+        self._run_input(["tap", x, y])
+
+    def place_card(self, card_xy, tile_xy, swipe=False):
+        """
+        Select a card and drop it on a tile with a single adb round trip,
+        either as two taps or as one drag. Returns the seconds it took.
+        """
+        start_time = time.time()
+        if swipe:
+            self._run_input(
+                ["swipe", *card_xy, *tile_xy, self.SWIPE_DURATION_MS]
+            )
+        else:
+            self._run_input(["tap", *card_xy], ["tap", *tile_xy])
+        return time.time() - start_time
 
     def load_deck(self, cards):
         id_str = ";".join([str(card.id_) for card in cards])
@@ -0,0 +1,210 @@
+from dataclasses import dataclass
+from dataclasses import field
+import threading
+import time
+from typing import Optional
+
+import numpy as np
+from PIL import Image
+
+# The stream is limited-range BT.601, while PIL converts full-range YCbCr,
+# so the planes are stretched to full range before converting
+Y_LUT = np.clip(np.round((np.arange(256) - 16) * 255 / 219), 0, 255).astype(
+    np.uint8
+)
+C_LUT = np.clip(
+    np.round((np.arange(256) - 128) * 255 / 224 + 128), 0, 255
+).astype(np.uint8)
+
+
+@dataclass(frozen=True)
+class Frame:
+    """
+    A decoded YUV 4:2:0 frame.
+
+    It can be used in place of a PIL image by the detectors: crop() only
+    converts the requested region to RGB, and luma() gives the grey
+    values of a region without any colour conversion.
+    """
+
+    seq: int
+    timestamp: float
+    y: np.ndarray
+    u: np.ndarray
+    v: np.ndarray
+    _image: list = field(default_factory=list, repr=False, compare=False)
+
+    @property
+    def width(self):
+        return self.y.shape[1]
+
+    @property
+    def height(self):
+        return self.y.shape[0]
+
+    @property
+    def size(self):
+        return self.width, self.height
+
+    def _clip_box(self, box):
+        l, t, r, b = (int(round(i)) for i in box)
+        return (
+            min(max(l, 0), self.width),
+            min(max(t, 0), self.height),
+            min(max(r, l, 0), self.width),
+            min(max(b, t, 0), self.height),
+        )
+
+    def luma(self, box=None) -> np.ndarray:
+        if box is None:
+            box = (0, 0, self.width, self.height)
+        l, t, r, b = self._clip_box(box)
+        return Y_LUT[self.y[t:b, l:r]]
+
+    def chroma(self, box=None):
+        """The U and V values covering a region, at half resolution"""
+        if box is None:
+            box = (0, 0, self.width, self.height)
+        l, t, r, b = self._clip_box(box)
+        rows = slice(t // 2, (b + 1) // 2)
+        columns = slice(l // 2, (r + 1) // 2)
+        return C_LUT[self.u[rows, columns]], C_LUT[self.v[rows, columns]]
+
+    def _to_rgb(self, l, t, r, b):
+        # Chroma is stored at half resolution, so take the chroma pixels
+        # covering the region plus a one pixel margin for the filter,
+        # upsample them and trim to the region
+        chroma_height, chroma_width = self.u.shape
+        cl, ct = max(l // 2 - 1, 0), max(t // 2 - 1, 0)
+        cr = min((r + 1) // 2 + 1, chroma_width)
+        cb = min((b + 1) // 2 + 1, chroma_height)
+        chroma_size = ((cr - cl) * 2, (cb - ct) * 2)
+        chroma_box = (l - 2 * cl, t - 2 * ct, r - 2 * cl, b - 2 * ct)
+        u, v = (
+            Image.fromarray(C_LUT[plane[ct:cb, cl:cr]])
+            .resize(chroma_size, Image.Resampling.BILINEAR)
+            .crop(chroma_box)
+            for plane in (self.u, self.v)
+        )
+        y = Image.fromarray(Y_LUT[self.y[t:b, l:r]])
+        return Image.merge("YCbCr", (y, u, v)).convert("RGB")
+
+    def to_image(self) -> Image.Image:
+        """The whole frame in RGB, converted once and then cached"""
+        if not self._image:
+            self._image.append(self._to_rgb(0, 0, self.width, self.height))
+        return self._image[0]
+
+    def crop(self, box) -> Image.Image:
+        if self._image:
+            return self._image[0].crop(box)
+
+        l, t, r, b = (int(round(i)) for i in box)
+        cl, ct, cr, cb = self._clip_box(box)
+        if cr <= cl or cb <= ct:
+            return Image.new("RGB", (max(r - l, 0), max(b - t, 0)))
+
+        rgb = self._to_rgb(cl, ct, cr, cb)
+        if (cl, ct, cr, cb) == (l, t, r, b):
+            return rgb
+
+        # Match PIL, which fills the area outside the frame with black
+        image = Image.new("RGB", (r - l, b - t))
+        image.paste(rgb, (cl - l, ct - t))
+        return image
+
+
+class FrameRingBuffer:
+    """
+    Fixed number of preallocated YUV 4:2:0 frames, written by the decoder
+    thread.
+
+    Frames handed out are views into the buffer, not copies. A frame taken
+    with pin=True keeps its slot until it is released, and the decoder
+    writes around it; any other frame stays valid only until `capacity`
+    newer frames have been published.
+    """
+
+    def __init__(self, capacity, height, width):
+        self.capacity = capacity
+        chroma_shape = (capacity, (height + 1) // 2, (width + 1) // 2)
+        self._y = np.zeros((capacity, height, width), dtype=np.uint8)
+        self._u = np.zeros(chroma_shape, dtype=np.uint8)
+        self._v = np.zeros(chroma_shape, dtype=np.uint8)
+        self._seqs = [0] * capacity
+        self._timestamps = [0.0] * capacity
+        self._pins = [0] * capacity
+        self._latest_index = capacity - 1
+        self._write_index = None
+        self._lock = threading.Lock()
+        self._published = threading.Condition(self._lock)
+        self.seq = 0
+
+    def next_slot(self):
+        """
+        The Y, U and V arrays the next frame should be written into: the
+        oldest slot that isn't pinned and doesn't hold the latest frame
+        """
+        with self._lock:
+            for step in range(1, self.capacity + 1):
+                index = (self._latest_index + step) % self.capacity
+                if not self._pins[index]:
+                    break
+            else:
+                raise RuntimeError(
+                    f"All {self.capacity} frame buffer slots are pinned"
+                )
+            self._write_index = index
+        return self._y[index], self._u[index], self._v[index]
+
+    def publish(self, timestamp=None) -> int:
+        if timestamp is None:
+            timestamp = time.time()
+        with self._lock:
+            seq = self.seq + 1
+            index = self._write_index
+            self._seqs[index] = seq
+            self._timestamps[index] = timestamp
+            self._latest_index = index
+            self._write_index = None
+            self.seq = seq
+            self._published.notify_all()
+        return seq
+
+    def _latest(self, after_seq, pin):
+        seq = self.seq
+        if seq <= after_seq:
+            return None
+        index = self._latest_index
+        if pin:
+            self._pins[index] += 1
+        return Frame(
+            seq,
+            self._timestamps[index],
+            self._y[index],
+            self._u[index],
+            self._v[index],
+        )
+
+    def latest(self, after_seq=0, pin=False) -> Optional[Frame]:
+        with self._lock:
+            return self._latest(after_seq, pin)
+
+    def wait(self, after_seq=0, timeout=None, pin=False) -> Optional[Frame]:
+        """
+        Block until a frame newer than after_seq is published.
+        Returns None if the timeout expires first.
+        """
+        with self._published:
+            self._published.wait_for(
+                lambda: self.seq > after_seq, timeout=timeout
+            )
+            return self._latest(after_seq, pin)
+
+    def release(self, frame):
+        """Let the decoder reuse the slot of a pinned frame"""
+        with self._lock:
+            index = self._seqs.index(frame.seq)
+            if self._pins[index] <= 0:
+                raise ValueError(f"Frame {frame.seq} is not pinned")
+            self._pins[index] -= 1
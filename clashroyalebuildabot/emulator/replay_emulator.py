@@ -0,0 +1,156 @@
+import os
+import threading
+import time
+
+import av
+from loguru import logger
+from PIL import Image
+
+from clashroyalebuildabot.emulator.base_emulator import BaseEmulator
+from error_handling import WikifiedError
+
+
+class ReplayEmulator(BaseEmulator):
+    """
+    Plays back a recorded screen instead of reading a live device.
+
+    The recording is either a video file, such as the raw H.264 stream from
+    screenrecord, or a directory of PNG screenshots played in name order.
+    Inputs are not sent anywhere: they are logged and kept in `inputs`
+    together with the sequence number of the frame on screen at the time.
+
+    speed scales the playback rate, with 0 playing frames as fast as they
+    can be decoded. With lockstep, each frame waits until the bot has taken
+    the previous one, so every run sees exactly the same frames.
+    """
+
+    def __init__(self, path, speed=1.0, fps=30, loop=False, lockstep=False):
+        super().__init__()
+        if not os.path.exists(path):
+            raise WikifiedError("000", f"Replay recording not found: {path}")
+        self.path = path
+        self.speed = speed
+        self.fps = fps
+        self.loop = loop
+        self.lockstep = lockstep
+        self.inputs = []
+
+        self.finished = threading.Event()
+        self._taken = threading.Condition()
+        self._taken_seq = 0
+        self._n_taken = 0
+        self._start_time = None
+
+        self.frame_thread = threading.Thread(target=self._play)
+        self.frame_thread.daemon = True
+        self.frame_thread.start()
+
+    def _read_frames(self):
+        """Yield each recorded frame with its time in seconds"""
+        if os.path.isdir(self.path):
+            names = sorted(
+                name
+                for name in os.listdir(self.path)
+                if name.lower().endswith(".png")
+            )
+            for i, name in enumerate(names):
+                with Image.open(os.path.join(self.path, name)) as image:
+                    yield i / self.fps, av.VideoFrame.from_image(
+                        image.convert("RGB")
+                    )
+            return
+
+        with av.open(self.path) as container:
+            for i, frame in enumerate(container.decode(video=0)):
+                # Raw H.264 streams carry no timestamps
+                if frame.time is None:
+                    yield i / self.fps, frame
+                else:
+                    yield frame.time, frame
+
+    def _wait_until_taken(self):
+        with self._taken:
+            while self._taken_seq < self.frames.seq:
+                self._taken.wait()
+
+    def _play_once(self, replay_start_time):
+        """
+        Play the recording through once. Frames are stamped with their
+        recorded time from replay_start_time on, whatever the speed, so
+        the tracker and the staleness checks don't depend on the host.
+        Returns the replay time at which the next pass starts.
+        """
+        start_time = time.time()
+        first_frame_time = None
+        timestamp = replay_start_time
+        for frame_time, frame in self._read_frames():
+            if first_frame_time is None:
+                first_frame_time = frame_time
+            if self.lockstep:
+                self._wait_until_taken()
+            elif self.speed > 0:
+                due = start_time + (frame_time - first_frame_time) / self.speed
+                delay = due - time.time()
+                if delay > 0:
+                    time.sleep(delay)
+
+            timestamp = replay_start_time + frame_time - first_frame_time
+            decode_start = time.time()
+            self._publish_frame(frame, timestamp)
+            self.decode_stats.decoded += 1
+            self.decode_stats.add_decode_time(time.time() - decode_start)
+        return timestamp + 1 / self.fps
+
+    def _play(self):
+        self._start_time = time.time()
+        replay_time = self._start_time
+        try:
+            while True:
+                replay_time = self._play_once(replay_time)
+                if not self.loop:
+                    break
+                logger.debug("Replay reached the end, starting over")
+        except (av.FFmpegError, OSError) as e:
+            logger.error(f"Error reading replay {self.path}: {str(e)}")
+        finally:
+            self._log_throughput()
+            self.finished.set()
+
+    def _log_throughput(self):
+        elapsed = max(time.time() - self._start_time, 1e-6)
+        logger.info(
+            f"Replay finished: {self.decode_stats.decoded} frames played, "
+            f"{self._n_taken} taken by the bot in {elapsed:.2f} seconds "
+            f"({self._n_taken / elapsed:.2f} frames/s)"
+        )
+
+    def wait_for_frame(self, after_seq=0, timeout=None, pin=False):
+        frame = super().wait_for_frame(after_seq, timeout, pin)
+        if frame is not None:
+            with self._taken:
+                if frame.seq > self._taken_seq:
+                    self._taken_seq = frame.seq
+                    self._n_taken += 1
+                    self._taken.notify_all()
+        return frame
+
+    def _record_input(self, name, *args):
+        seq = self.frames.seq
+        logger.info(f"Replay input at frame {seq}: {name} {args}")
+        self.inputs.append((seq, name, args))
+
+    def click(self, x, y):
+        self._record_input("click", x, y)
+
+    def place_card(self, card_xy, tile_xy, swipe=False):
+        self._record_input("place_card", card_xy, tile_xy, swipe)
+        return 0.0
+
+    def start_game(self):
+        self._record_input("start_game")
+
+    def stop_game(self):
+        self._record_input("stop_game")
+
+    def load_deck(self, cards):
+        self._record_input("load_deck", [card.name for card in cards])
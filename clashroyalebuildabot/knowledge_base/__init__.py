@@ -27,6 +27,10 @@ class KnowledgeBase:
         self.dynamic_positioning = self.load_dynamic_positioning()
         self.clash_royale_database = self.load_clash_royale_database()
         
+        # Decisões por carta do passo atual, descartadas quando o passo muda
+        self._decision_step = None
+        self._card_decisions = {}
+        
         logger.info("Base de conhecimento carregada com sucesso")
     
     def load_json_file(self, filename: str) -> Dict:
@@ -702,8 +706,24 @@ class KnowledgeBase:
         """Retorna condições de uso das cartas"""
         return self.card_intelligence.get("usage_conditions", {})
     
-    def analyze_card_decision(self, card_name: str, game_state: Dict, enemy_analysis: Dict = None) -> Dict:
-        """Análise completa de decisão para usar uma carta"""
+    def analyze_card_decision(self, card_name: str, game_state: Dict, enemy_analysis: Dict = None, step=None) -> Dict:
+        """
+        Análise completa de decisão para usar uma carta.
+        Com step (qualquer objeto que identifique o passo atual), a decisão
+        de cada carta é calculada uma vez e reaproveitada até o passo mudar,
+        já que só depende da carta e do estado do jogo naquele passo.
+        """
+        if step is None:
+            return self._analyze_card_decision(card_name, game_state, enemy_analysis)
+        
+        if step is not self._decision_step:
+            self._decision_step = step
+            self._card_decisions = {}
+        if card_name not in self._card_decisions:
+            self._card_decisions[card_name] = self._analyze_card_decision(card_name, game_state, enemy_analysis)
+        return self._card_decisions[card_name]
+    
+    def _analyze_card_decision(self, card_name: str, game_state: Dict, enemy_analysis: Dict = None) -> Dict:
         card_data = self.get_card_intelligence(card_name)
         if not card_data:
             return {"decision": "unknown", "reason": "card_not_found"}
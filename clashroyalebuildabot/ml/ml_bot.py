@@ -165,8 +165,31 @@ class MLBot:
     
     def predict_action_score(self, state, action, enemy_analysis=None):
         """Prediz o score de uma ação específica"""
-        if not self.trained:
-            return 0.5  # Score neutro se não treinado
+        return float(self.score_actions(state, [action], enemy_analysis)[0])
+    
+    def _action_features(self, actions):
+        """Características de todas as ações, uma linha por ação"""
+        action_index = np.array([getattr(action, 'index', 0) for action in actions], dtype=float)
+        tile_x = np.array([getattr(action, 'tile_x', 0) for action in actions], dtype=float)
+        tile_y = np.array([getattr(action, 'tile_y', 0) for action in actions], dtype=float)
+        return np.column_stack([
+            action_index,  # Índice da carta
+            tile_x,  # Posição X
+            tile_y,  # Posição Y
+            # Normaliza posições
+            tile_x / 18.0,  # Normaliza X (0-18)
+            tile_y / 15.0,  # Normaliza Y (0-15)
+        ])
+    
+    def score_actions(self, state, actions, enemy_analysis=None):
+        """
+        Prediz o score de todas as ações de uma vez.
+        As características do estado são extraídas uma só vez e o modelo
+        avalia todas as ações numa única chamada de predict.
+        """
+        neutral = np.full(len(actions), 0.5)  # Score neutro
+        if not self.trained or not actions:
+            return neutral
         
         try:
             # Extrai características do estado
@@ -183,36 +206,28 @@ class MLBot:
                 
                 if expected_features != actual_features:
                     logger.warning(f"Feature mismatch: expected {expected_features}, got {actual_features}. Using neutral score.")
-                    return 0.5
+                    return neutral
                 
                 state_features_scaled = self.scaler.transform(state_features)
             
-            # Características da ação com verificações de segurança
+            # Características das ações com verificações de segurança
             try:
-                action_index = action.index if hasattr(action, 'index') else 0
-                tile_x = action.tile_x if hasattr(action, 'tile_x') else 0
-                tile_y = action.tile_y if hasattr(action, 'tile_y') else 0
-                
-                action_features = np.array([
-                    action_index,  # Índice da carta
-                    tile_x,  # Posição X
-                    tile_y,  # Posição Y
-                    # Normaliza posições
-                    tile_x / 18.0,  # Normaliza X (0-18)
-                    tile_y / 15.0,  # Normaliza Y (0-15)
-                ]).reshape(1, -1)
+                action_features = self._action_features(actions)
             except Exception as e:
                 logger.warning(f"Error extracting action features: {e}")
                 # Valores padrão em caso de erro
-                action_features = np.array([0, 0, 0, 0, 0]).reshape(1, -1)
+                action_features = np.zeros((len(actions), 5))
             
-            # Combina características
-            combined_features = np.hstack([state_features_scaled, action_features])
+            # Combina características: o mesmo estado em todas as linhas
+            combined_features = np.hstack([
+                np.repeat(state_features_scaled, len(actions), axis=0),
+                action_features,
+            ])
             
             # Verificar se o modelo foi treinado
             if not hasattr(self.model, 'predict'):
                 logger.warning("Model not properly trained, returning neutral score")
-                return 0.5
+                return neutral
             
             # Verificar compatibilidade de features do modelo
             if hasattr(self.model, 'n_features_in_'):
@@ -221,19 +236,14 @@ class MLBot:
                 
                 if expected_model_features != actual_combined_features:
                     logger.warning(f"Model feature mismatch: expected {expected_model_features}, got {actual_combined_features}. Using neutral score.")
-                    return 0.5
-            
-            # Prediz o score
-            predicted_score = self.model.predict(combined_features)[0]
-            
-            # Normaliza o score entre 0 e 1
-            predicted_score = max(0.0, min(1.0, predicted_score))
+                    return neutral
             
-            return predicted_score
+            # Prediz os scores e normaliza entre 0 e 1
+            return np.clip(self.model.predict(combined_features), 0.0, 1.0)
             
         except Exception as e:
             logger.warning(f"ML prediction failed: {e}")
-            return 0.5  # Score neutro em caso de erro
+            return neutral  # Score neutro em caso de erro
     
     def train(self, game_data):
         """Treina o modelo com dados de partidas"""
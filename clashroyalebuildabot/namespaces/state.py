@@ -1,10 +1,13 @@
 from dataclasses import dataclass
+from dataclasses import field
 from typing import List, Tuple
 
 from clashroyalebuildabot.namespaces.cards import Card
 from clashroyalebuildabot.namespaces.numbers import Numbers
 from clashroyalebuildabot.namespaces.screens import Screen
+from clashroyalebuildabot.namespaces.units import Track
 from clashroyalebuildabot.namespaces.units import UnitDetection
+from clashroyalebuildabot.namespaces.units import UnitEvent
 
 
 @dataclass
@@ -15,3 +18,5 @@ class State:
     cards: Tuple[Card, Card, Card, Card]
     ready: List[int]
     screen: Screen
+    tracks: List[Track] = field(default_factory=list)
+    events: List[UnitEvent] = field(default_factory=list)
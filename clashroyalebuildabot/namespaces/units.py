@@ -2,6 +2,8 @@ from dataclasses import asdict
 from dataclasses import dataclass
 from typing import Literal, Optional, Tuple
 
+import numpy as np
+
 
 @dataclass(frozen=True)
 class UnitCategory:
@@ -45,6 +47,42 @@ class UnitDetection:
     position: Position
 
 
+@dataclass
+class Track:
+    track_id: int
+    side: str
+    detection: UnitDetection
+    position: np.ndarray
+    velocity: np.ndarray
+    first_seen: float
+    last_seen: float
+    hits: int = 1
+    confirmed: bool = False
+
+    @property
+    def name(self):
+        return self.detection.unit.name
+
+    @property
+    def tile(self) -> Tuple[float, float]:
+        return float(self.position[0]), float(self.position[1])
+
+    def predict(self, seconds) -> Tuple[float, float]:
+        """Where the unit will be in this many seconds, in tiles"""
+        x, y = self.position + self.velocity * seconds
+        return float(x), float(y)
+
+
+@dataclass(frozen=True)
+class UnitEvent:
+    DEPLOYED = "deployed"
+    DIED = "died"
+
+    kind: str
+    track: Track
+    timestamp: float
+
+
 @dataclass(frozen=True)
 class _UnitsNamespace:
     ARCHER: Unit = Unit(